@@ -0,0 +1,54 @@
+import pandas as pd
+
+
+# ------------------ Point-in-time Fundamentals ------------------
+# A fundamentals row becomes usable on its publication date. Rows without one
+# are assumed to be published reporting_lag_days after the financial year
+# ends on 31 March of their year ("Mar 2023" -> FY2023).
+
+FISCAL_YEAR_END_MONTH = 3
+FISCAL_YEAR_END_DAY = 31
+
+
+def available_dates(history_df, reporting_lag_days):
+    fiscal_year_end = pd.to_datetime(pd.DataFrame({
+        "year": history_df["year"].astype(int),
+        "month": FISCAL_YEAR_END_MONTH,
+        "day": FISCAL_YEAR_END_DAY,
+    }))
+    estimated = fiscal_year_end + pd.Timedelta(days=reporting_lag_days)
+    if "published_on" not in history_df:
+        return estimated
+    return pd.to_datetime(history_df["published_on"]).fillna(estimated)
+
+
+def last_estimated_year(date, reporting_lag_days):
+    # Newest fiscal year whose estimated publication date is on or before date
+    year = date.year
+    while pd.Timestamp(year, FISCAL_YEAR_END_MONTH, FISCAL_YEAR_END_DAY) + pd.Timedelta(days=reporting_lag_days) > date:
+        year -= 1
+    return year
+
+
+def asof_snapshots(history_df, dates, reporting_lag_days):
+    # Latest published row per company for every date, from a single merge_asof
+    # over the (dates x companies) grid instead of one query per period
+    history_df = history_df.assign(available_on=available_dates(history_df, reporting_lag_days))
+    history_df = history_df.sort_values("available_on")
+
+    grid = pd.MultiIndex.from_product(
+        [pd.DatetimeIndex(dates), history_df["company_id"].unique()],
+        names=["rebalance_date", "company_id"],
+    ).to_frame(index=False).sort_values("rebalance_date")
+
+    snapshots = pd.merge_asof(
+        grid,
+        history_df,
+        left_on="rebalance_date",
+        right_on="available_on",
+        by="company_id",
+        direction="backward",
+        allow_exact_matches=True,
+    )
+    snapshots = snapshots.dropna(subset=["available_on"])
+    return snapshots.astype({"year": int})
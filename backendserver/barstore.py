@@ -0,0 +1,106 @@
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------ OHLCV Bar Store ------------------
+# One float32 .npy file per ticker, {ticker}.bars.npy, shape (6, n + 1):
+#   column 0      header: [first_day, end_day) the bars were fetched for, then NaN
+#   columns 1..n  row 0 the date (days since 1970-01-01, exact in float32),
+#                 rows 1-5 Open, High, Low, Close, Volume; sorted by date
+# Dates, bars and range live in the same file, so one os.replace swaps them
+# together and a reader never sees one writer's bars under another's dates.
+# Files are memory-mapped on read, so a query only touches the pages of the
+# dates it asks for. The range tells a missing ticker from a holiday: a query
+# outside it is treated as not stored and goes to the next provider.
+
+OHLCV_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def to_days(dates):
+    return ((pd.DatetimeIndex(dates).values.astype("datetime64[D]") - EPOCH).astype(np.int32))
+
+
+def from_days(days):
+    return pd.DatetimeIndex(EPOCH + np.asarray(days).astype(np.int64).astype("timedelta64[D]"))
+
+
+class BarStore:
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, ticker):
+        return os.path.join(self.folder, f"{ticker}.bars.npy")
+
+    def load(self, ticker, mmap_mode=None):
+        # (covered range, dates, bars) or None when nothing usable is stored
+        try:
+            stored = np.load(self.path(ticker), mmap_mode=mmap_mode)
+        except (FileNotFoundError, ValueError):
+            return None
+        if stored.ndim != 2 or stored.shape[0] != len(OHLCV_FIELDS) + 1 or stored.shape[1] < 1:
+            return None
+        covered = (int(stored[0, 0]), int(stored[1, 0]))
+        return covered, stored[0, 1:], stored[1:, 1:]
+
+    def covered_range(self, ticker):
+        stored = self.load(ticker, mmap_mode="r")
+        return stored[0] if stored is not None else None
+
+    def read(self, ticker, start, end):
+        # OHLCV frame for [start, end), or None when that window was never stored
+        stored = self.load(ticker, mmap_mode="r")
+        if stored is None:
+            return None
+        covered, dates, bars = stored
+        start_day, end_day = to_days([start, end])
+        if start_day < covered[0] or end_day > covered[1]:
+            return None
+        lo, hi = np.searchsorted(dates, [start_day, end_day])
+        return pd.DataFrame(np.array(bars[:, lo:hi]).T, index=from_days(dates[lo:hi]), columns=OHLCV_FIELDS)
+
+    def write(self, ticker, frame, start, end):
+        # Bars fetched for [start, end); merged with what is stored when the windows touch.
+        # Two writers racing on a ticker can drop one's merge, never mix their files.
+        frame = frame.reindex(columns=OHLCV_FIELDS).dropna(how="all")
+        today = to_days([pd.Timestamp.today().normalize()])[0]
+        # Today's bar may still change, so coverage stops before it
+        start_day, end_day = to_days([start, end])
+        end_day = min(end_day, today)
+        if end_day <= start_day:
+            return
+        frame = frame[to_days(frame.index) < end_day]
+        dates, bars = to_days(frame.index).astype(np.float32), frame.to_numpy(dtype=np.float32).T
+
+        stored = self.load(ticker)
+        if stored is not None:
+            covered, old_dates, old_bars = stored
+            if covered[0] <= end_day and start_day <= covered[1]:
+                keep = (old_dates < start_day) | (old_dates >= end_day)
+                dates = np.concatenate([old_dates[keep], dates])
+                bars = np.concatenate([old_bars[:, keep], bars], axis=1)
+                order = np.argsort(dates, kind="stable")
+                dates, bars = dates[order], bars[:, order]
+                start_day, end_day = min(start_day, covered[0]), max(end_day, covered[1])
+
+        header = np.full((len(OHLCV_FIELDS) + 1, 1), np.nan, dtype=np.float32)
+        header[:2, 0] = [start_day, end_day]
+        values = np.concatenate([header, np.vstack([dates[None, :], bars])], axis=1)
+
+        # Each writer has its own temp file; the rename is the only shared step
+        tmp = f"{self.path(ticker)}.{uuid.uuid4().hex}.tmp.npy"
+        try:
+            np.save(tmp, np.ascontiguousarray(values))
+            os.replace(tmp, self.path(ticker))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def write_frame(self, data, start, end):
+        # data: (field, ticker) columns as returned by the providers
+        for ticker in data.columns.get_level_values(1).unique():
+            self.write(ticker, data.xs(ticker, axis=1, level=1), start, end)
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from downsample import downsample_rows
+
+
+# ------------------ Run Comparison ------------------
+# Equity curves of several runs are aligned on the union of their dates, the
+# benchmark is sampled as of the same dates, and everything is rebased to 1 at
+# the first date all series share.
+
+
+def align_curves(curves, benchmark=None):
+    # curves: {name: Series of portfolio values indexed by date}
+    aligned = pd.concat(curves, axis=1, join="outer").sort_index().ffill()
+    if benchmark is not None and not benchmark.empty:
+        aligned["benchmark"] = benchmark.sort_index().reindex(aligned.index, method="ffill")
+
+    # Common window: from the first date where every series has a value
+    aligned = aligned.dropna(how="any")
+    if aligned.empty:
+        raise ValueError("The selected runs do not overlap in time.")
+    return aligned / aligned.iloc[0]
+
+
+def periods_per_year(index):
+    if len(index) < 2:
+        return 1.0
+    spacing = np.median(np.diff(index.values).astype("timedelta64[D]").astype(float))
+    return 365.25 / max(spacing, 1.0)
+
+
+def drawdowns(aligned):
+    return aligned / aligned.cummax() - 1
+
+
+def relative_metrics(aligned, reference):
+    # Tracking error, information ratio and correlation of every series against the reference
+    returns = aligned.pct_change().iloc[1:]
+    scale = periods_per_year(aligned.index)
+    years = max((aligned.index[-1] - aligned.index[0]).days / 365.25, 1 / scale)
+
+    active = returns.sub(returns[reference], axis=0)
+    tracking_error = active.std() * np.sqrt(scale)
+    information_ratio = (active.mean() * scale) / tracking_error.replace(0, np.nan)
+    correlation = returns.corrwith(returns[reference])
+    cagr = aligned.iloc[-1] ** (1 / years) - 1
+    max_drawdown = drawdowns(aligned).min()
+
+    metrics = {}
+    for name in aligned.columns:
+        metrics[name] = {
+            "cagr": round(float(cagr[name]) * 100, 2),
+            "max_drawdown": round(float(max_drawdown[name]) * 100, 2),
+        }
+        if name != reference:
+            metrics[name].update({
+                "excess_cagr": round(float(cagr[name] - cagr[reference]) * 100, 2),
+                "tracking_error": round(float(tracking_error[name]) * 100, 2),
+                "information_ratio": None if np.isnan(information_ratio[name]) else round(float(information_ratio[name]), 2),
+                "correlation": None if np.isnan(correlation[name]) else round(float(correlation[name]), 4),
+            })
+    return metrics
+
+
+def comparison_payload(aligned, reference, max_points):
+    chart = pd.concat({"equity": aligned, "drawdown": drawdowns(aligned)}, axis=1)
+    # Shape-preserving downsampling on a shared date axis
+    days = chart.index.values.astype("datetime64[D]").astype(float)
+    chart = chart.iloc[downsample_rows([chart[column] for column in chart.columns], max_points, days)]
+    return {
+        "reference": reference,
+        "points": len(chart),
+        "dates": chart.index.strftime('%Y-%m-%d').tolist(),
+        "series": {
+            name: {
+                "equity": chart["equity"][name].round(4).tolist(),
+                "drawdown": chart["drawdown"][name].round(4).tolist(),
+            }
+            for name in aligned.columns
+        },
+        "metrics": relative_metrics(aligned, reference),
+    }
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+
+# ------------------ Transaction Cost Model ------------------
+# All rates are in basis points of traded notional. Turnover is the sum of
+# absolute weight changes between the drifted weights held at the end of the
+# previous period and the target weights of the new period.
+
+BPS = 1e-4
+
+
+def drifted_weights(shares, end_prices):
+    # Weights actually held at the end of a period, after prices have moved
+    values = shares * end_prices
+    total = values.sum()
+    if total == 0:
+        return values * 0.0
+    return values / total
+
+
+def apply_min_trade(prev_weights, target_weights, min_trade_weight):
+    # Trades smaller than the threshold are skipped: the name keeps its drifted
+    # weight, and the rest of the book is rescaled so the weights still sum to 1
+    if min_trade_weight <= 0 or prev_weights is None:
+        return target_weights
+
+    prev = prev_weights.reindex(target_weights.index).fillna(0.0)
+    skip = ((target_weights - prev).abs() < min_trade_weight) & (prev > 0)
+    if not skip.any():
+        return target_weights
+
+    executed = target_weights.where(~skip, prev)
+    held = executed[skip].sum()
+    traded = executed[~skip].sum()
+    if held >= 1 or traded == 0:
+        return executed / executed.sum()
+    executed[~skip] = executed[~skip] * (1 - held) / traded
+    return executed
+
+
+def weight_changes(prev_weights, target_weights):
+    # Row difference of the (previous, target) weight matrix over the union of
+    # names; names that left the portfolio have a target weight of 0
+    if prev_weights is None:
+        return target_weights.abs()
+    matrix = pd.concat([prev_weights, target_weights], axis=1).fillna(0.0)
+    return pd.Series(np.abs(np.diff(matrix.to_numpy(), axis=1)[:, 0]), index=matrix.index)
+
+
+def rebalance_costs(prev_weights, target_weights, capital, config):
+    # Returns the executed weights, the turnover (traded notional as a fraction
+    # of capital) and the cost in currency
+    executed = apply_min_trade(prev_weights, target_weights, config.min_trade_weight)
+    delta = weight_changes(prev_weights, executed)
+
+    turnover = float(delta.sum())
+    linear_rate = (config.commission_bps + config.slippage_bps) * BPS
+    # Market impact grows with the size of the trade: cost = k * |dw|^2 per name
+    impact = config.impact_bps * BPS * float((delta ** 2).sum())
+    cost = capital * (linear_rate * turnover + impact)
+
+    return executed, turnover, min(cost, capital)
+
@@ -0,0 +1,49 @@
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+
+
+# ------------------ Engines and Pooling ------------------
+# The sync engine serves the backtest workers (which run in the threadpool),
+# the async engine serves the light request handlers on the event loop.
+# Pool sizes are read from the environment, see .env.example.
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def pool_settings(url):
+    # SQLite has no server-side connection limit to size a pool against
+    if url.get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": True,
+    }
+
+
+def async_url(db_url):
+    # Swap the sync driver for its asyncio counterpart, keeping credentials and options
+    url = make_url(db_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {url.get_backend_name()}")
+    return url.set(drivername=driver)
+
+
+def create_sync_engine(db_url):
+    return create_engine(db_url, **pool_settings(make_url(db_url)))
+
+
+def create_async_db_engine(db_url):
+    # ASYNC_DB_URL, when set, is used as is (e.g. to pick asyncpg instead of psycopg)
+    override = os.getenv("ASYNC_DB_URL")
+    url = make_url(override) if override else async_url(db_url)
+    return create_async_engine(url, **pool_settings(url))
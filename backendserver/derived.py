@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+
+# ------------------ Derived Fundamentals ------------------
+# ROE, PE and market cap for every (ticker, year) at once from long-format
+# frames, plus data-quality checks. Inputs:
+#   raw:    ticker, year, roce, pat, eps, equity, reserves  (equity/reserves in ₹ Cr)
+#   prices: ticker, year, price
+# Output columns follow the fundamentals CSV read by script.py.
+
+RAW_COLUMNS = ["roce", "pat", "eps", "equity", "reserves"]
+OUTLIER_METRICS = ["roce", "roe", "pe"]
+OUTLIER_Z = 3.5
+
+
+def raw_to_long(results):
+    # [{"ticker": ..., metric: {year: value}}] -> one row per (ticker, year)
+    cells = [
+        (company["ticker"], int(year), metric, value)
+        for company in results
+        for metric in RAW_COLUMNS
+        for year, value in (company.get(metric) or {}).items()
+    ]
+    cells = pd.DataFrame(cells, columns=["ticker", "year", "metric", "value"])
+    raw = cells.pivot_table(index=["ticker", "year"], columns="metric", values="value", aggfunc="first", dropna=False)
+    return raw.reindex(columns=RAW_COLUMNS).astype(float).rename_axis(columns=None).reset_index()
+
+
+def prices_to_long(prices_wide):
+    # prices_by_ticker.csv layout: tickers as rows, years as columns
+    prices = prices_wide.rename_axis("ticker").reset_index().melt(id_vars="ticker", var_name="year", value_name="price")
+    prices["year"] = prices["year"].astype(int)
+    return prices
+
+
+def safe_divide(numerator, denominator):
+    # NaN where the denominator is zero or missing, like the old per-year loops' None
+    denominator = denominator.where(denominator != 0)
+    return numerator / denominator
+
+
+def derive_metrics(raw, prices):
+    df = raw.merge(prices, on=["ticker", "year"], how="left")
+    book_value = df["equity"] + df["reserves"]
+    derived = pd.DataFrame({
+        "companyticker": df["ticker"],
+        "year": df["year"],
+        "roce": df["roce"],
+        "roe": (safe_divide(df["pat"], book_value) * 100).round(2),
+        "pat": df["pat"],
+        "pe": safe_divide(df["price"], df["eps"]).round(2),
+        # equity capital (₹ Cr) taken as share count in crores at ₹1 face value
+        "marketcap": (df["equity"] * df["price"]).round(2),
+    })
+    return derived.sort_values(["companyticker", "year"]).reset_index(drop=True)
+
+
+def quality_checks(raw, prices, derived, years=None):
+    # One row per issue: ticker, year, check, metric, value. Nothing is dropped here.
+    df = raw.merge(prices, on=["ticker", "year"], how="left")
+    issues = []
+
+    for check, metric, mask in [
+        ("zero_denominator", "roe", (df["equity"] + df["reserves"]) == 0),
+        ("zero_denominator", "pe", df["eps"] == 0),
+        ("negative_eps", "pe", df["eps"] < 0),
+        ("missing_price", "pe", df["price"].isna()),
+    ]:
+        issues.append(pd.DataFrame({
+            "ticker": df.loc[mask, "ticker"], "year": df.loc[mask, "year"],
+            "check": check, "metric": metric, "value": np.nan,
+        }))
+
+    # Years with no raw values at all, over the expected range
+    years = sorted(years if years is not None else df["year"].unique())
+    grid = pd.MultiIndex.from_product([df["ticker"].unique(), years], names=["ticker", "year"])
+    present = df.set_index(["ticker", "year"])[RAW_COLUMNS].notna().any(axis=1)
+    present = present.groupby(level=["ticker", "year"]).any().reindex(grid, fill_value=False)
+    missing = present[~present].index.to_frame(index=False)
+    issues.append(missing.assign(check="missing_year", metric=None, value=np.nan))
+
+    # Outliers: robust z-score against the same year's cross-section
+    for metric in OUTLIER_METRICS:
+        values = derived[metric]
+        median = values.groupby(derived["year"]).transform("median")
+        mad = (values - median).abs().groupby(derived["year"]).transform("median")
+        z = 0.6745 * (values - median) / mad.where(mad > 0)
+        mask = z.abs() > OUTLIER_Z
+        issues.append(pd.DataFrame({
+            "ticker": derived.loc[mask, "companyticker"], "year": derived.loc[mask, "year"],
+            "check": "outlier", "metric": metric, "value": values[mask],
+        }))
+
+    issues = [issue for issue in issues if not issue.empty]
+    if not issues:
+        return pd.DataFrame(columns=["ticker", "year", "check", "metric", "value"])
+    return pd.concat(issues, ignore_index=True).sort_values(["ticker", "year"]).reset_index(drop=True)
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+# ------------------ Curve Downsampling ------------------
+# Largest-Triangle-Three-Buckets: keeps the first and last points and, from each
+# bucket in between, the point forming the largest triangle with the previously
+# kept point and the average of the next bucket. Peaks and troughs survive,
+# which plain striding would drop.
+
+# LTTB keeps at least the first, last and one interior point of a series
+MIN_POINTS_PER_SERIES = 3
+
+
+def lttb_indices(y, max_points, x=None):
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if max_points is None or max_points >= n or n <= 2:
+        return np.arange(n)
+    max_points = max(max_points, 3)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    # Bucket boundaries over the interior points 1 .. n-2
+    edges = np.floor(np.linspace(1, n - 1, max_points - 1)).astype(int)
+    selected = np.empty(max_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], max(edges[bucket + 1], edges[bucket] + 1)
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_end = max(next_end, next_start + 1)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        selected[bucket + 1] = a
+
+    return np.unique(selected)
+
+
+def min_points(column_count):
+    # Smallest max_points that gives every column its minimum share
+    return MIN_POINTS_PER_SERIES * column_count
+
+
+def downsample_rows(columns, max_points, x=None):
+    # Shared row selection for several series on one axis: each column gets an
+    # equal share of the budget and the kept rows are merged, so at most
+    # max_points rows come back
+    columns = [np.asarray(c, dtype=float) for c in columns]
+    n = len(columns[0]) if columns else 0
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    if max_points < min_points(len(columns)):
+        raise ValueError(f"max_points must be at least {min_points(len(columns))} for {len(columns)} series")
+    budget = max_points // len(columns)
+    return np.unique(np.concatenate([lttb_indices(c, budget, x) for c in columns]))
@@ -0,0 +1,112 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from scheduler import trading_days
+
+
+# ------------------ Price Factors ------------------
+# Factors are named <kind><months>, e.g. mom12, vol3, dd6, adv1, and can be used
+# in config.ranking next to the fundamentals columns ("mom12:desc,pe:asc").
+
+FACTOR_PATTERN = re.compile(r"^(mom|vol|dd|adv)(\d+)$")
+TRADING_DAYS_PER_MONTH = 21
+TRADING_DAYS_PER_YEAR = 252
+# Extra trading rows fetched ahead of the longest window, for closes a ticker missed
+HISTORY_BUFFER_ROWS = 10
+
+# (factor, date) -> factor values indexed by ticker, shared across runs and
+# request threads, so every access holds the lock
+MAX_CACHE_ENTRIES = 20000
+_factor_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def parse_factors(ranking):
+    metrics = [r.split(':')[0].strip() for r in ranking.split(',') if ':' in r]
+    return [m for m in dict.fromkeys(metrics) if FACTOR_PATTERN.match(m)]
+
+
+def factor_window(name):
+    months = int(FACTOR_PATTERN.match(name).group(2))
+    return months * TRADING_DAYS_PER_MONTH
+
+
+def compute_factor(name, close, volume):
+    # Rolling computation over the whole (dates x tickers) matrix at once
+    kind = FACTOR_PATTERN.match(name).group(1)
+    window = factor_window(name)
+
+    if kind == "mom":
+        return close.pct_change(window, fill_method=None)
+    if kind == "vol":
+        returns = close.pct_change(fill_method=None)
+        return returns.rolling(window, min_periods=window).std() * np.sqrt(TRADING_DAYS_PER_YEAR)
+    if kind == "dd":
+        return close / close.rolling(window, min_periods=window).max() - 1
+    return volume.rolling(window, min_periods=window).mean()
+
+
+def history_start(date, rows):
+    # The trading day `rows` sessions before date, counted on the exchange
+    # calendar so holiday-heavy months still leave a full window
+    calendar = trading_days(date - pd.Timedelta(days=rows * 2 + 30), date)
+    return calendar[calendar < date][-rows]
+
+
+def _cache_get(name, date, tickers):
+    with _cache_lock:
+        values = _factor_cache.get((name, date))
+        if values is None or not tickers.isin(values.index).all():
+            return None
+        _factor_cache.move_to_end((name, date))
+        return values
+
+
+def _cache_put(name, date, values):
+    with _cache_lock:
+        _factor_cache[(name, date)] = values
+        if len(_factor_cache) > MAX_CACHE_ENTRIES:
+            _factor_cache.popitem(last=False)
+
+
+def load_factor_values(factor_names, dates, tickers, fetch_prices):
+    # Returns {date: DataFrame(ticker, <factor columns>)}. Only dates missing from
+    # the cache trigger a price fetch, and all of them share a single download.
+    tickers = pd.Index(tickers)
+    dates = [pd.Timestamp(d) for d in dates]
+    # Values are kept here as well as cached: other runs may evict them meanwhile
+    values_by_key = {}
+    for date in dates:
+        for name in factor_names:
+            values = _cache_get(name, date, tickers)
+            if values is not None:
+                values_by_key[(name, date)] = values
+    missing = [d for d in dates if any((f, d) not in values_by_key for f in factor_names)]
+
+    if missing:
+        longest = max(factor_window(f) for f in factor_names)
+        start = history_start(min(missing), longest + 1 + HISTORY_BUFFER_ROWS)
+        prices = fetch_prices(tickers.tolist(), start.strftime('%Y-%m-%d'), max(missing).strftime('%Y-%m-%d'))
+        close = prices["Close"].reindex(columns=tickers)
+        volume = prices["Volume"].reindex(columns=tickers)
+
+        # Factor values as of a date only use closes strictly before it
+        rows = close.index.searchsorted(pd.DatetimeIndex(missing), side="left") - 1
+        for name in factor_names:
+            frame = compute_factor(name, close, volume).to_numpy()
+            for date, row in zip(missing, rows):
+                values = pd.Series(frame[row] if row >= 0 else np.full(len(tickers), np.nan), index=tickers)
+                values_by_key[(name, date)] = values
+                # NaNs from a short download are not cached; a later run may have the history
+                if row >= factor_window(name):
+                    _cache_put(name, date, values)
+
+    result = {}
+    for date in dates:
+        columns = {name: values_by_key[(name, date)].reindex(tickers) for name in factor_names}
+        result[date] = pd.DataFrame(columns).rename_axis("ticker").reset_index()
+    return result
@@ -10,14 +10,9 @@ import random
 import os
 import json
 import pandas as pd
-import csv
+import sys
 
-
-# Load the CSV
-df_prices = pd.read_csv("prices_by_ticker.csv", index_col=0)
-
-# Convert DataFrame to nested dict: {ticker: {year: price}}
-prices_by_ticker = df_prices.to_dict(orient="index")
+from derived import raw_to_long, prices_to_long, derive_metrics, quality_checks
 
 def get_equity_and_reserves_from_soup(soup):
     equity_by_year = {}
@@ -67,15 +62,6 @@ def get_equity_and_reserves_from_soup(soup):
     return equity_by_year, reserves_by_year
 
 
-def compute_roe(pat, equity, reserves):
-    roe = {}
-    for year in pat:
-        if year in equity and year in reserves:
-            denominator = equity[year] + reserves[year]
-            roe[year] = round((pat[year] / denominator) * 100, 2) if denominator else None
-    return roe
-
-
 def get_roce_from_soup(soup):
     roce_by_year = {}
 
@@ -120,7 +106,7 @@ def get_pat_eps_from_soup(soup):
     # 1. Find the profit-loss section
     pl_section = soup.find("section", {"id": "profit-loss"})
     if not pl_section:
-        return pat_by_year  # return empty if not found
+        return pat_by_year, eps_by_year  # return empty if not found
 
     # 2. Find the table inside profit-loss section
     table = pl_section.find("table")
@@ -166,28 +152,6 @@ def get_pat_eps_from_soup(soup):
     return pat_by_year, eps_by_year
 
 
-def compute_pe_ratio(price_by_year, eps_by_year):
-    pe_by_year = {}
-    for year in price_by_year:
-        price = price_by_year.get(year)
-        eps = eps_by_year.get(year)
-        if price is not None and eps and eps != 0:
-            pe_by_year[year] = round(price / eps, 2)
-    return pe_by_year
-
-
-def compute_market_cap(price_by_year, equity_by_year):
-    market_cap_by_year = {}
-    for year in price_by_year:
-        if year in equity_by_year:
-            total_shares = equity_by_year[year] * 1e7  # equity in crores
-            price = price_by_year[year]
-            market_cap_by_year[year] = round((total_shares * price) / 1e7, 2)  # result in crores
-    return market_cap_by_year
-
-
-
-
 CACHE_FILE = "screener_cache.json"
 HEADERS = {
     "User-Agent": (
@@ -206,24 +170,17 @@ def save_cache(cache):
     with open(CACHE_FILE, "w", encoding="utf-8") as f:
         json.dump(cache, f, indent=2)
 
-def get_metrics(ticker, soup):
-    ratios = {}
-    prices = prices_by_ticker[ticker]
-    ratios["ROCE"]=get_roce_from_soup(soup)
-    ratios["PAT"], ratios["EPS"]=get_pat_eps_from_soup(soup)
+def get_metrics(soup):
+    # Raw per-year values only; ROE, PE and market cap are derived for all
+    # tickers at once in derived.py
+    pat, eps = get_pat_eps_from_soup(soup)
     equity, reserves = get_equity_and_reserves_from_soup(soup)
-    ratios["ROE"]=compute_roe(ratios["PAT"], equity, reserves)
-    ratios["Market Cap"]= compute_market_cap(prices, equity)
-    ratios["PE"]=compute_pe_ratio(prices, ratios["EPS"])
-
-
     return {
-        "market_cap": ratios.get("Market Cap"),  # In ₹ Cr
-        "pe": ratios.get("PE"),
-        "roce": ratios.get("ROCE"),
-        "roe": ratios.get("ROE"),
-        "pat": ratios.get("PAT"),
-        "eps":ratios.get("EPS")
+        "roce": get_roce_from_soup(soup),
+        "pat": pat,
+        "eps": eps,
+        "equity": equity,
+        "reserves": reserves
     }
 
 def polite_delay(min_sec=2, max_sec=5):
@@ -236,7 +193,8 @@ def scrape_fundamentals(ticker, use_cache=True):
     url = f"https://www.screener.in/company/{ticker.replace('.NS', '')}/"
     cache = load_cache()
 
-    if use_cache and ticker in cache:
+    # Entries cached before the raw format lack equity/reserves and are re-scraped
+    if use_cache and ticker in cache and "equity" in cache[ticker]:
         print(f"🧠 Using cached data for {ticker}")
         return cache[ticker]
 
@@ -255,15 +213,7 @@ def scrape_fundamentals(ticker, use_cache=True):
         soup = BeautifulSoup(response.text, "html.parser")
 
 
-        metrics = get_metrics(ticker,soup)
-        data = {
-            "ticker": ticker,
-            "roce": metrics["roce"],
-            "roe": metrics["roe"],
-            "pe": metrics["pe"],
-            "market_cap": metrics["market_cap"],
-            "pat": metrics["pat"]
-        }
+        data = {"ticker": ticker, **get_metrics(soup)}
 
         # Cache the result
         cache[ticker] = data
@@ -318,39 +268,26 @@ for ticker in tickers_11:
   if result:
       results.append(result)
 
-metrics = ["roce", "roe", "pat", "pe", "market_cap"]
-
-# Flattened list to write
-rows = []
-
-for company in results:
-    ticker = company["ticker"]
-    # Gather all years across the metrics for this company
-    all_years = set()
-    for metric in metrics:
-        all_years.update(company.get(metric, {}).keys())
-    
-    for year in sorted(all_years):
-        row = {
-            "companyticker": ticker,
-            "year": year,
-        }
-        for metric in metrics:
-            value = company.get(metric, {}).get(year, None)
-            # normalize key name for CSV
-            csv_key = "marketcap" if metric == "market_cap" else metric
-            row[csv_key] = value
-        rows.append(row)
+# Derived metrics for every (ticker, year) in one pass
+raw_df = raw_to_long(results)
+prices_df = prices_to_long(pd.read_csv("prices_by_ticker.csv", index_col=0))
+fundamentals_df = derive_metrics(raw_df, prices_df)
 
+issues_df = quality_checks(raw_df, prices_df, fundamentals_df, years=range(2019, 2025))
+if not issues_df.empty:
+    print("⚠️ Data-quality issues:")
+    print(issues_df.groupby(["check", "metric"], dropna=False).size().to_string())
+    issues_df.to_csv("NewFundament11_issues.csv", index=False)
 
 # Save to CSV
 output_file = "NewFundament11.csv"
-with open(output_file, "w", newline="") as f:
-    writer = csv.DictWriter(f, fieldnames=["companyticker", "year", "roce", "roe", "pat", "pe", "marketcap"])
-    writer.writeheader()
-    writer.writerows(rows)
+fundamentals_df.to_csv(output_file, index=False)
+print(f"✅ Saved {len(fundamentals_df)} rows to {output_file}")
 
-print(f"✅ Saved {len(rows)} rows to {output_file}")
+# Optionally load straight into the database (companies must be seeded)
+if "--ingest" in sys.argv:
+    from script import insert_fundamentals_df
+    insert_fundamentals_df(fundamentals_df)
 
 
 # Load the CSV file
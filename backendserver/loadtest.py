@@ -0,0 +1,311 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+import httpx
+import numpy as np
+import pandas as pd
+
+
+# ------------------ Load Test ------------------
+# Starts the app in-process on a throwaway SQLite database with synthetic
+# prices served by providers.MemoryProvider (no Postgres, no Yahoo), then
+# drives a weighted mix of endpoints at each concurrency level and reports
+# latency percentiles, throughput and how busy the worker threadpool was.
+#
+#   python loadtest.py --concurrency 1,4,16 --requests 60
+#   python loadtest.py --mix run-backtest:1 --worker-threads 8 --json report.json
+#   python loadtest.py --url http://localhost:8000   # an already running instance
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MIX = "run-backtest:3,compute-nifty:2,export-backtest:1"
+BACKTEST_CONFIG = {
+    "initial_capital": 100000,
+    "start_date": "2020-01-01",
+    "end_date": "2023-12-31",
+    "rebalance_frequency": "quarterly",
+    "position_sizing": "equal",
+    "portfolio_size": 10,
+    "market_cap_min": 0,
+    "market_cap_max": 1e12,
+    "roce": 0,
+    "pat": 0,
+    "ranking": "roe:desc,pe:asc",
+    "compranking": "yes",
+}
+
+
+# ------------------ Stand-ins ------------------
+
+def seed_database(path, fundamentals_csv):
+    # Same tables and columns as schema.sql, built from the bundled fundamentals CSV
+    fundamentals_df = pd.read_csv(fundamentals_csv).rename(columns={"marketcap": "market_cap"})
+    tickers = sorted(fundamentals_df["companyticker"].unique())
+    company_ids = {ticker: i + 1 for i, ticker in enumerate(tickers)}
+    fundamentals_df["company_id"] = fundamentals_df["companyticker"].map(company_ids)
+
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        conn.executescript("""
+            CREATE TABLE companies (id INTEGER PRIMARY KEY, ticker TEXT UNIQUE NOT NULL);
+            CREATE TABLE fundamentals (id INTEGER PRIMARY KEY, company_id INTEGER NOT NULL, year INTEGER NOT NULL,
+                roe REAL, roce REAL, pat BIGINT, pe REAL, market_cap BIGINT, published_on DATE);
+            CREATE TABLE prices (id INTEGER PRIMARY KEY, company_id INTEGER NOT NULL, year INTEGER NOT NULL, price REAL NOT NULL);
+        """)
+        pd.DataFrame({"id": list(company_ids.values()), "ticker": tickers}).to_sql("companies", conn, if_exists="append", index=False)
+        fundamentals_df.drop(columns=["companyticker"]).to_sql("fundamentals", conn, if_exists="append", index=False)
+    return tickers
+
+
+def synthetic_bars(tickers, start="2014-01-01", end="2026-12-31"):
+    # Deterministic random-walk OHLCV per ticker, seeded by the ticker name
+    dates = pd.bdate_range(start, end)
+    frames = {}
+    for ticker in tickers:
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, len(dates))))
+        spread = np.abs(rng.normal(0, 0.01, len(dates)))
+        frames[ticker] = pd.DataFrame({
+            "Open": close * (1 + rng.normal(0, 0.005, len(dates))),
+            "High": close * (1 + spread),
+            "Low": close * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(10_000, 1_000_000, len(dates)).astype(float),
+        }, index=dates)
+    return frames
+
+
+def prepare_workdir(rate_limit, worker_threads):
+    # Exports, temp files and the SQLite file all live in a scratch directory
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    os.makedirs(os.path.join(workdir, "data"))
+    shutil.copy(os.path.join(HERE, "data", "nse_holidays.csv"), os.path.join(workdir, "data"))
+    tickers = seed_database(os.path.join(workdir, "loadtest.db"), os.path.join(HERE, "data", "New-fundamental_data.csv"))
+
+    os.environ["DB_URL"] = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    os.environ["RATE_LIMIT"] = rate_limit
+    os.environ["WORKER_THREADS"] = str(worker_threads)
+    os.environ["PRICE_PROVIDERS"] = "local"
+    os.chdir(workdir)
+    return workdir, tickers
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(tickers):
+    import uvicorn
+
+    sys.path.insert(0, HERE)
+    import main
+    from providers import MemoryProvider, ProviderChain
+
+    main.market_data = ProviderChain([MemoryProvider(synthetic_bars(tickers + ["^NSEI"]))])
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return main.app, server, f"http://127.0.0.1:{port}"
+
+
+# ------------------ Workload ------------------
+
+class SaturationSampler:
+    # Polls how many threadpool tokens (worker threads) are in use
+    def __init__(self, limiter, interval=0.05):
+        self.limiter = limiter
+        self.interval = interval
+        self.samples = []
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            self.samples.append(self.limiter.borrowed_tokens)
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+    def summary(self):
+        total = self.limiter.total_tokens
+        busy = np.array(self.samples or [0])
+        return {
+            "threads": total,
+            "mean_busy": round(float(busy.mean()), 2),
+            "max_busy": int(busy.max()),
+            "saturated_pct": round(float((busy >= total).mean()) * 100, 1),
+        }
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.strip().partition(":")
+        if kind not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in mix: {kind}. Use {list(ENDPOINTS)}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+async def call_run_backtest(client, state):
+    return await client.post("/run-backtest", json=state["config"])
+
+
+async def call_compute_nifty(client, state):
+    return await client.post("/compute-nifty", json=state["config"])
+
+
+async def call_export_backtest(client, state):
+    return await client.get("/export-backtest", params={"run_id": state["run_id"]})
+
+
+ENDPOINTS = {
+    "run-backtest": call_run_backtest,
+    "compute-nifty": call_compute_nifty,
+    "export-backtest": call_export_backtest,
+}
+
+
+async def run_level(base_url, concurrency, total, weights, state, timeout, seed):
+    # Closed loop: `concurrency` clients, each sending its next request as soon as the last returns
+    rng = random.Random(seed)
+    queue = asyncio.Queue()
+    for kind in rng.choices(list(weights), weights=list(weights.values()), k=total):
+        queue.put_nowait(kind)
+
+    results = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker():
+            while not queue.empty():
+                kind = queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    status = (await ENDPOINTS[kind](client, state)).status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                results.append({"endpoint": kind, "status": status, "latency": time.perf_counter() - started})
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def summarize(results, elapsed):
+    df = pd.DataFrame(results)
+    rows = {}
+    for name, group in [("all", df)] + list(df.groupby("endpoint")):
+        latency_ms = group["latency"].to_numpy() * 1000
+        ok = group["status"].isin([200])
+        rows[name] = {
+            "requests": len(group),
+            "errors": int((~ok).sum()),
+            "rate_limited": int((group["status"] == 429).sum()),
+            "error_codes": " ".join(f"{status}x{count}" for status, count in group.loc[~ok, "status"].value_counts().items()),
+            "p50_ms": round(float(np.percentile(latency_ms, 50)), 1),
+            "p95_ms": round(float(np.percentile(latency_ms, 95)), 1),
+            "p99_ms": round(float(np.percentile(latency_ms, 99)), 1),
+            "max_ms": round(float(latency_ms.max()), 1),
+            "throughput_rps": round(len(group) / elapsed, 2),
+        }
+    return rows
+
+
+def print_level(concurrency, summary, saturation, out):
+    print(f"\n== concurrency {concurrency} ==", file=out)
+    print(pd.DataFrame(summary).T.to_string(), file=out)
+    if saturation:
+        print(f"worker threads: {saturation}", file=out)
+
+
+# ------------------ Entry Point ------------------
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the backtest API")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma separated client counts, one run per level")
+    parser.add_argument("--requests", type=int, default=50, help="requests per concurrency level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint:weight pairs")
+    parser.add_argument("--config", help="JSON overrides for the backtest config")
+    parser.add_argument("--rate-limit", default="1000000/minute", help="RATE_LIMIT for the in-process app")
+    parser.add_argument("--worker-threads", type=int, default=0, help="WORKER_THREADS for the in-process app")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", help="test a running instance instead of the in-process app")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own output")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # The in-process app runs from a scratch directory
+    args.json = os.path.abspath(args.json) if args.json else None
+    weights = parse_mix(args.mix)
+    config = {**BACKTEST_CONFIG, **json.loads(args.config or "{}")}
+    out = sys.stdout
+
+    app = server = workdir = None
+    cwd = os.getcwd()
+    base_url = args.url
+    if base_url is None:
+        workdir, tickers = prepare_workdir(args.rate_limit, args.worker_threads)
+        print(f"Stand-ins ready in {workdir}: SQLite with {len(tickers)} companies, in-memory prices", file=out)
+        app, server, base_url = start_app(tickers)
+
+    # The app prints per rebalance; keep the report readable
+    quiet = open(os.devnull, "w")
+    report = {"base_url": base_url, "mix": weights, "levels": []}
+    try:
+        with contextlib.redirect_stdout(out if args.verbose else quiet):
+            # One warm-up backtest gives export-backtest a run to fetch
+            warmup = httpx.post(f"{base_url}/run-backtest", json=config, timeout=args.timeout)
+            warmup.raise_for_status()
+            state = {"config": config, "run_id": warmup.json()["run_id"]}
+
+            for level in [int(c) for c in args.concurrency.split(",")]:
+                sampler = SaturationSampler(app.state.thread_limiter) if app is not None else contextlib.nullcontext()
+                with sampler:
+                    results, elapsed = asyncio.run(run_level(base_url, level, args.requests, weights, state, args.timeout, args.seed))
+                summary = summarize(results, elapsed)
+                saturation = sampler.summary() if app is not None else None
+                report["levels"].append({"concurrency": level, "elapsed_s": round(elapsed, 2),
+                                         "endpoints": summary, "worker_threads": saturation})
+                print_level(level, summary, saturation, out)
+    finally:
+        quiet.close()
+        if server is not None:
+            server.should_exit = True
+        if workdir is not None:
+            # The scratch database and exports are only for this run
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}", file=out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,55 @@
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-import yfinance as yf
+from fastapi.middleware.gzip import GZipMiddleware
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, func, Table, MetaData, select, and_, text, inspect
+from sqlalchemy import func, Table, MetaData, select, and_, or_, inspect
 from pydantic import BaseModel
-from dateutil.relativedelta import relativedelta
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from fastapi.responses import PlainTextResponse, StreamingResponse
-import time
-import random
+from fastapi.responses import PlainTextResponse, StreamingResponse, FileResponse
+from fastapi.concurrency import run_in_threadpool
+from anyio import to_thread
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Literal
 from dotenv import load_dotenv
 import os
 from io import BytesIO
 import zipfile
+import uuid
+import threading
+import time
+
+from costs import rebalance_costs, drifted_weights
+from sizing import size_periods
+from factors import parse_factors, load_factor_values
+from records import new_run_buffers, movers_payload
+from robustness import METHODS, load_composition, run_robustness
+from scheduler import build_schedule, map_to_rows
+from universe import Universe, listing_intervals
+from asof import asof_snapshots, last_estimated_year
+from db import create_sync_engine, create_async_db_engine
+from registry import create_registry, register_run, list_runs, get_run, delete_run, apply_retention, read_artifact_csv, SORTABLE
+from compare import align_curves, comparison_payload, periods_per_year
+from downsample import downsample_rows, min_points
+from providers import build_provider
+from profiling import PROFILE_MODES, SORT_KEYS, profile_path, start_profiler, finish_profiler
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Sizes the threadpool on startup; the limiter is kept on app.state so load
+    # tests can sample how many threads are busy
+    app.state.thread_limiter = to_thread.current_default_thread_limiter()
+    if WORKER_THREADS:
+        app.state.thread_limiter.total_tokens = WORKER_THREADS
+    yield
 
 
 # Create FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
@@ -40,6 +69,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (equity curves, comparisons) for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # ------------------ Database Connection ------------------
 # Replace with your actual credentials
 # Load .env file
@@ -47,7 +79,9 @@ load_dotenv()
 
 # Get the DB URL
 DB_URL = os.getenv("DB_URL")
-engine = create_engine(DB_URL)
+engine = create_sync_engine(DB_URL)
+# Used by the async handlers so light queries never wait for a worker thread
+async_engine = create_async_db_engine(DB_URL)
 
 metadata = MetaData()
 companies = Table("companies", metadata, autoload_with=engine)
@@ -58,8 +92,44 @@ inspector = inspect(engine)
 tables = inspector.get_table_names()
 print("Tables in database:", tables)
 
-save_dir = "data/tmp"
-os.makedirs(save_dir, exist_ok=True)
+# Optional point-in-time universe tables (see schema.sql)
+company_listings = Table("company_listings", metadata, autoload_with=engine) if "company_listings" in tables else None
+index_membership = Table("index_membership", metadata, autoload_with=engine) if "index_membership" in tables else None
+
+export_dir = "data/exports"
+os.makedirs(export_dir, exist_ok=True)
+
+# Run registry table and its indexes are created on startup if missing
+create_registry(engine)
+
+# Retention policy for past runs, 0 disables each rule
+RUN_RETENTION_DAYS = int(os.getenv("RUN_RETENTION_DAYS", 0))
+RUN_RETENTION_MAX_RUNS = int(os.getenv("RUN_RETENTION_MAX_RUNS", 0))
+RUN_COMPACT_AFTER_DAYS = int(os.getenv("RUN_COMPACT_AFTER_DAYS", 0))
+
+# Per-client limit on the heavy endpoints, in slowapi syntax ("5/minute", "100/hour")
+RATE_LIMIT = os.getenv("RATE_LIMIT", "5/minute")
+# Rebalance periods whose prices are loaded together when streaming; 1 keeps a
+# streamed run's price data to about one period
+STREAM_CHUNK_PERIODS = int(os.getenv("STREAM_CHUNK_PERIODS", 1))
+# Threads serving the sync endpoints; 0 keeps anyio's default of 40
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", 0))
+
+
+# ------------------ Market Data ------------------
+# Bars saved by earlier runs first, then local per-ticker files, Yahoo for the
+# rest. Tests and load tests can swap in a providers.MemoryProvider by
+# reassigning market_data.
+market_data = build_provider(
+    [name.strip() for name in os.getenv("PRICE_PROVIDERS", "store,local,yfinance").split(",") if name.strip()],
+    os.getenv("PRICE_DATA_DIR", "data/prices"),
+    store_dir=os.getenv("PRICE_STORE_DIR", "data/bars"),
+    retries=int(os.getenv("PRICE_FETCH_RETRIES", 3)),
+    timeout=float(os.getenv("PRICE_FETCH_TIMEOUT", 30)),
+    deadline=float(os.getenv("PRICE_FETCH_DEADLINE", 60)),
+    breaker_threshold=int(os.getenv("PRICE_BREAKER_THRESHOLD", 5)),
+    breaker_reset=float(os.getenv("PRICE_BREAKER_RESET", 60)),
+)
 
 
 # /ping route (GET)
@@ -75,16 +145,53 @@ class BacktestConfig(BaseModel):
     initial_capital: float
     start_date: str
     end_date: str
-    rebalance_frequency: str  # "monthly", "quarterly", "yearly"
-    position_sizing: str      # "equal", "market_cap", "roce"
+    rebalance_frequency: str  # "weekly", "monthly", "quarterly", "yearly", "month_end", "day_of_month", "signal"
+    position_sizing: str      # "equal", "market_cap", "roce", "roe", "inverse_vol", "risk_parity"
     portfolio_size: int
     market_cap_min: float
     market_cap_max: float
     roce: float
     pat: float
-    ranking: str  # "roe:desc,pe:asc"
+    ranking: str  # "roe:desc,pe:asc", price factors such as "mom12:desc,vol3:asc" are also accepted
     compranking: str
-
+    commission_bps: float = 0.0    # per unit of traded notional
+    slippage_bps: float = 0.0      # per unit of traded notional
+    impact_bps: float = 0.0        # scaled by the squared weight change per name
+    min_trade_weight: float = 0.0  # skip trades smaller than this weight change
+    max_weight: float = 1.0        # per-name cap
+    min_weight: float = 0.0        # per-name floor
+    vol_lookback_days: int = 90    # trailing window for inverse_vol / risk_parity
+    rebalance_day: int = None      # day_of_month: calendar day, rolled to the next trading day; 29-31 mean the last day in shorter months
+    signal_dates: list[str] = None # signal: dates on which the signal fired
+    universe: str = None           # index name from index_membership, e.g. "NIFTY100"; None = all listed companies
+    reporting_lag_days: int = 60   # days after the 31 March year end before results are usable, when published_on is unknown
+    execution_price: Literal["close", "next_open", "vwap"] = "close" # "close": rebalance-day close, "next_open": next day's open, "vwap": next days' volume-weighted typical price
+    vwap_days: int = 1             # vwap: number of bars the order is worked over
+
+
+class RobustnessConfig(BaseModel):
+    run_id: str
+    method: str = "block_bootstrap"  # "block_bootstrap", "random_start", "universe_subset"
+    simulations: int = 1000
+    seed: int = 42
+    block_size: int = 3           # block_bootstrap: consecutive periods per block
+    min_periods: int = 12         # random_start: shortest sampled window
+    subset_fraction: float = 0.7  # universe_subset: chance each holding is kept
+    workers: int = None           # chunks run in parallel, capped at the CPU count
+
+MAX_SIMULATIONS = 100000
+
+class ScreenConfig(BaseModel):
+    as_of: str
+    market_cap_min: float
+    market_cap_max: float
+    roce: float
+    pat: float
+    ranking: str = None       # fundamentals columns only, e.g. "roe:desc,pe:asc"
+    compranking: str = "no"
+    portfolio_size: int = None
+    universe: str = None
+    reporting_lag_days: int = 60
 
 
 def calculate_metrics(portfolio: pd.DataFrame):
@@ -97,10 +204,14 @@ def calculate_metrics(portfolio: pd.DataFrame):
             "max_drawdown": 0.0
         }
 
-    # Calculate number of years between first and last point
-    months = len(portfolio)
-    cagr = ((portfolio['value'].iloc[-1] / portfolio['value'].iloc[0]) ** (1 / (months / 12))) - 1
-    sharpe = returns.mean() / returns.std() * np.sqrt(12)
+    # Annualised from the dates of the curve, like /compare, whatever the rebalance frequency
+    dates = pd.DatetimeIndex(pd.to_datetime(portfolio['date']))
+    scale = periods_per_year(dates)
+    years = max((dates[-1] - dates[0]).days / 365.25, 1 / scale)
+    cagr = ((portfolio['value'].iloc[-1] / portfolio['value'].iloc[0]) ** (1 / years)) - 1
+    # A run held in cash throughout has no volatility
+    std = returns.std()
+    sharpe = returns.mean() / std * np.sqrt(scale) if std > 0 else 0.0
     drawdown = (portfolio['value'] / portfolio['value'].cummax()) - 1
     max_drawdown = drawdown.min()
     portfolio['drawdown'] = drawdown
@@ -118,23 +229,12 @@ async def echo(data: EchoData):
     return {"received": data.dict()}
 
 
-def safe_download(tickers, start, end, retries=3, delay=1):
-    for attempt in range(retries):
-        try:
-            print("Fetching from Yahoo")
-            
-            data = yf.download(tickers=tickers, start=start, end=end)["Close"]
-            filename = f"prices_{tickers[0]}_{start}_{end}.csv".replace(":", "-")
-            file_path = os.path.join(save_dir, filename)
-            data.to_csv(file_path)
-            print("Data yf downloaded")
-
-            return data
-        except Exception as e:
-            wait_time = delay * (2 ** attempt) + random.random()
-            print(f"[Retry {attempt + 1}] Error fetching data: {e} | Retrying in {round(wait_time, 2)}s...")
-            time.sleep(wait_time)
-    raise Exception(f"Failed to fetch data for {tickers} after {retries} retries.")
+def download_prices(tickers, start, end, fields="Close"):
+    # Bars for the requested fields from the configured providers; raises when
+    # no provider could answer instead of returning an empty frame
+    data = market_data.fetch(list(tickers), start, end)[fields]
+    print("Price data downloaded")
+    return data
 
 
 def ranking_logic(fundamentals_df, config):
@@ -160,93 +260,182 @@ def ranking_logic(fundamentals_df, config):
 
     
 def fetch_rebalance_dates(start,end,config):
-    start = pd.to_datetime(config.start_date)
-    end = pd.to_datetime(config.end_date)
-    rebalance_freq = {
-        "monthly": relativedelta(months=1),
-        "quarterly": relativedelta(months=3),
-        "yearly": relativedelta(years=1),
-    }.get(config.rebalance_frequency, relativedelta(months=1))
-
-    rebalance_dates = []
-    current = start
-    while current < end:
-        rebalance_dates.append(current)
-        current += rebalance_freq
-    rebalance_dates.append(end)
-
-    return rebalance_dates
-
-
-def fetch_fundamentals(year_cutoff,config):
-    # Step 1: Fetch fundamentals based on user filters
-        # Step 2: Subquery to get latest year for each company before or equal to start_year
-        latest_fundamentals_subq = (
-            select(
-                fundamentals.c.company_id,
-                func.max(fundamentals.c.year).label("max_year")
-            )
-            .where(fundamentals.c.year <= year_cutoff)
-            .group_by(fundamentals.c.company_id)
-            .alias("latest_f")
+    return build_schedule(config, start, end)
+
+
+def fundamentals_columns():
+    columns = [
+        companies.c.ticker,
+        fundamentals.c.company_id,
+        fundamentals.c.roce,
+        fundamentals.c.pat,
+        fundamentals.c.roe,
+        fundamentals.c.pe,
+        fundamentals.c.market_cap,
+        fundamentals.c.year
+    ]
+    if "published_on" in fundamentals.c:
+        columns.append(fundamentals.c.published_on)
+    return columns
+
+
+def read_fundamentals_history(conn, max_year):
+    # Every fundamentals row that could be visible up to max_year
+    stmt = (
+        select(*fundamentals_columns())
+        .select_from(fundamentals.join(companies, fundamentals.c.company_id == companies.c.id))
+        .where(fundamentals.c.year <= max_year)
+    )
+    history_df = pd.read_sql(stmt, conn)
+    print("Query returned:", len(history_df), "rows")
+    return history_df
+
+
+def latest_fundamentals_query(as_of, reporting_lag_days):
+    # Only the newest year each company had published by as_of, for single-date screens
+    visible = fundamentals.c.year <= last_estimated_year(as_of, reporting_lag_days)
+    if "published_on" in fundamentals.c:
+        visible = or_(
+            fundamentals.c.published_on <= as_of.date(),
+            and_(fundamentals.c.published_on.is_(None), visible),
         )
-        stmt = (
-            select(
-                companies.c.ticker,
-                fundamentals.c.company_id,
-                fundamentals.c.roce,
-                fundamentals.c.pat,
-                fundamentals.c.roe,
-                fundamentals.c.pe,
-                fundamentals.c.market_cap,
-                fundamentals.c.year
-            )
-            .select_from(
-                fundamentals
-                .join(latest_fundamentals_subq,
-                    and_(
-                        fundamentals.c.company_id == latest_fundamentals_subq.c.company_id,
-                        fundamentals.c.year == latest_fundamentals_subq.c.max_year
-                    ))
-                .join(companies, fundamentals.c.company_id == companies.c.id)
-            )
-            .where(
-                and_(
-                    fundamentals.c.roce >= config.roce,
-                    fundamentals.c.pat >= config.pat,
-                    fundamentals.c.market_cap.between(config.market_cap_min, config.market_cap_max)
-                )
-            )
+    latest = (
+        select(fundamentals.c.company_id, func.max(fundamentals.c.year).label("year"))
+        .where(visible)
+        .group_by(fundamentals.c.company_id)
+        .subquery()
+    )
+    return (
+        select(*fundamentals_columns())
+        .select_from(
+            fundamentals
+            .join(companies, fundamentals.c.company_id == companies.c.id)
+            .join(latest, and_(fundamentals.c.company_id == latest.c.company_id, fundamentals.c.year == latest.c.year))
         )
+    )
 
-        with engine.connect() as conn:
-            
-            fundamentals_df = pd.read_sql(stmt, conn)
-            print("Query returned:", len(fundamentals_df), "rows")
 
+def screen_fundamentals(history_df, rebalance_dates, config):
+    # Latest published row per company as of each rebalance date
+    snapshots = asof_snapshots(history_df, rebalance_dates, config.reporting_lag_days)
 
-        if fundamentals_df.empty:
-            raise Exception("No companies match the filter criteria.")
+    # User filters on the point-in-time values
+    snapshots = snapshots[
+        (snapshots["roce"] >= config.roce)
+        & (snapshots["pat"] >= config.pat)
+        & snapshots["market_cap"].between(config.market_cap_min, config.market_cap_max)
+    ]
 
-        print("Fetch Fundamentals")
-        return fundamentals_df
+    # Dates with nothing published yet (or nothing passing the filters) are absent
+    return {date: df.reset_index(drop=True) for date, df in snapshots.groupby("rebalance_date")}
 
-def allocate_weights(top_ranked_df,tickers_this_period, config):
-    
-    if config.position_sizing == 'equal':
-        weights = {ticker: 1 / len(ticker) for ticker in tickers_this_period}
-    elif config.position_sizing == 'market_cap':
-        caps = top_ranked_df.set_index('ticker').loc[tickers_this_period, 'market_cap']
-        total = caps.sum()
-        weights = {ticker: caps[ticker] / total for ticker in tickers_this_period}
-    elif config.position_sizing in ['roce', 'roe']:
-        vals = top_ranked_df.set_index('ticker').loc[tickers_this_period, config.position_sizing]
-        total = vals.sum()
-        weights = {ticker: vals[ticker] / total for ticker in tickers_this_period}
-    else:
-        weights = {ticker: 1 / len(ticker) for ticker in tickers_this_period}
 
-    return weights
+def fetch_fundamentals(rebalance_dates, config):
+    # One query for the whole run, resolved point-in-time in memory
+    with engine.connect() as conn:
+        history_df = read_fundamentals_history(conn, max(rebalance_dates).year)
+
+    print("Fetch Fundamentals")
+    return screen_fundamentals(history_df, rebalance_dates, config)
+
+
+def fetch_universe_tickers():
+    with engine.connect() as conn:
+        return [row.ticker for row in conn.execute(select(companies.c.ticker))]
+
+
+def fetch_factor_prices(tickers, start, end):
+    return download_prices(tickers, start, end, fields=["Close", "Volume"])
+
+
+# Bar fields each execution price needs; only these are held in memory
+EXECUTION_FIELDS = {
+    "close": ["Close"],
+    "next_open": ["Open", "Close"],
+    "vwap": ["High", "Low", "Close", "Volume"],
+}
+
+
+def load_price_bars(tickers, start, end, fields):
+    # One (dates x tickers) matrix per field for every ticker of the run
+    end = (pd.Timestamp(end) + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+    data = download_prices(tickers, pd.Timestamp(start).strftime('%Y-%m-%d'), end, fields=fields)
+    return {field: data[field].reindex(columns=tickers).sort_index() for field in fields}
+
+
+def execution_matrix(bars, config):
+    # Fill price per (date, ticker) for an order placed after that date's signal
+    if config.execution_price == "close":
+        return bars["Close"]
+    if config.execution_price == "next_open":
+        return bars["Open"]
+    # VWAP proxy: typical price weighted by volume over the vwap_days bars from this one
+    typical = (bars["High"] + bars["Low"] + bars["Close"]) / 3
+    volume = bars["Volume"].fillna(0)
+    window = max(config.vwap_days, 1)
+    traded = (typical * volume)[::-1].rolling(window, min_periods=1).sum()[::-1]
+    total_volume = volume[::-1].rolling(window, min_periods=1).sum()[::-1]
+    # No volume reported: plain typical price
+    return (traded / total_volume.where(total_volume > 0)).fillna(typical)
+
+
+def check_universe(universe_name):
+    # A named universe without the membership table would quietly mean every listed company
+    if universe_name and index_membership is None:
+        raise HTTPException(status_code=400, detail=f"Universe {universe_name} needs the index_membership table, which does not exist.")
+
+
+def read_universe(conn, universe_name):
+    check_universe(universe_name)
+    listings_df = membership_df = None
+    if company_listings is not None:
+        listings_df = listing_intervals(pd.read_sql(select(company_listings), conn))
+    if index_membership is not None and universe_name:
+        membership_df = pd.read_sql(
+            select(index_membership.c.company_id, index_membership.c.start_date, index_membership.c.end_date)
+            .where(index_membership.c.index_name == universe_name),
+            conn
+        )
+        if membership_df.empty:
+            raise Exception(f"No membership data for universe {universe_name}.")
+    return Universe(listings_df, membership_df)
+
+
+def load_universe(config):
+    # One read of the interval tables per run; period lookups are then in memory
+    with engine.connect() as conn:
+        return read_universe(conn, config.universe)
+
+
+# /screen reuses a universe's index for a few minutes instead of rebuilding it per request
+UNIVERSE_CACHE_SECONDS = 300
+_universe_cache = {}
+_universe_cache_lock = threading.Lock()
+
+
+def cached_universe(universe_name):
+    with _universe_cache_lock:
+        cached = _universe_cache.get(universe_name)
+    if cached is not None and time.monotonic() - cached[0] < UNIVERSE_CACHE_SECONDS:
+        return cached[1]
+    with engine.connect() as conn:
+        universe = read_universe(conn, universe_name)
+    with _universe_cache_lock:
+        _universe_cache[universe_name] = (time.monotonic(), universe)
+    return universe
+
+
+def allocate_weights(top_ranked_dfs, tickers_by_period, config, trailing_by_period=None):
+    # Weights for a stack of periods, sized together
+    scores_by_period = None
+    if config.position_sizing in ['market_cap', 'roce', 'roe']:
+        # Positional lookup instead of re-indexing the frame by ticker every period
+        scores_by_period = []
+        for top_ranked_df, tickers in zip(top_ranked_dfs, tickers_by_period):
+            rows = pd.Index(top_ranked_df['ticker']).get_indexer(tickers)
+            scores_by_period.append(top_ranked_df[config.position_sizing].to_numpy(dtype=float)[rows])
+
+    return size_periods(tickers_by_period, config, scores_by_period=scores_by_period, trailing_by_period=trailing_by_period)
 
 def exportconfig(run_id,config): 
 
@@ -255,6 +444,9 @@ def exportconfig(run_id,config):
     "start_date": config.start_date,
     "end_date": config.end_date,
     "rebalance_frequency": config.rebalance_frequency,
+    "rebalance_day": config.rebalance_day,
+    "universe": config.universe,
+    "reporting_lag_days": config.reporting_lag_days,
     "portfolio_size": config.portfolio_size,
     "ranking": config.ranking,
     "compranking": config.compranking,
@@ -264,176 +456,402 @@ def exportconfig(run_id,config):
     "pat": config.pat,
     "market_cap_min": config.market_cap_min,
     "market_cap_max": config.market_cap_max,
+    "commission_bps": config.commission_bps,
+    "slippage_bps": config.slippage_bps,
+    "impact_bps": config.impact_bps,
+    "min_trade_weight": config.min_trade_weight,
+    "max_weight": config.max_weight,
+    "min_weight": config.min_weight,
+    "vol_lookback_days": config.vol_lookback_days,
+    "execution_price": config.execution_price,
+    "vwap_days": config.vwap_days,
     "run_date": datetime.now()
     }])
-    config_df.to_csv(f"data/exports/{run_id}_config.csv", index=False)
-
-
-@app.post("/run-backtest")
-@limiter.limit("5/minute")
-def run_backtest(request: Request,config: BacktestConfig):
-    try:
-        run_id = datetime.now().strftime("%Y-%m-%d_%H-%M-%S") 
-        exportconfig(run_id,config)
-        start_year = pd.to_datetime(config.start_date).year
-        end_year = pd.to_datetime(config.end_date).year
-        rebalance_dates = fetch_rebalance_dates(start_year,end_year,config)
-        print("-" * 50)
-        print("Rebalance dates:", rebalance_dates)
-        print("No of rebalances:", len(rebalance_dates))
-        
-        portfolio_history = []
-        portfolio_composition_records=[]
-        top_ranked_records=[]
-        winners_and_losers = []
-        capital = config.initial_capital
-
-        for i in range(len(rebalance_dates) - 1):
+    config_df.to_csv(f"{export_dir}/{run_id}_config.csv", index=False)
+
+
+def iter_backtest_periods(config, rebalance_dates, buffers, chunk_periods=None):
+    # Generator over rebalance periods: appends each period's rows to the
+    # buffers and yields its equity point. Periods are ranked, priced and sized
+    # a chunk at a time (the whole run by default); a chunk's price matrix is
+    # released when the next chunk starts.
+    capital = config.initial_capital
+    prev_weights = None
+
+    # Price factors referenced in the ranking are computed per chunk, so a
+    # streamed run only downloads its chunk's dates plus the factor lookback
+    factor_names = parse_factors(config.ranking)
+    universe_tickers = fetch_universe_tickers() if factor_names else []
+
+    universe = load_universe(config)
+    fundamentals_by_date = fetch_fundamentals(rebalance_dates[:-1], config)
+
+    trailing_sizing = config.position_sizing in ['inverse_vol', 'risk_parity']
+    lookback = pd.Timedelta(days=config.vol_lookback_days if trailing_sizing else 0)
+    # Orders after the close fill on the following bars, which the last period needs too
+    fill_offset = 0 if config.execution_price == "close" else 1
+    fill_days = 10 + 2 * config.vwap_days if fill_offset else 0
+
+    periods = len(rebalance_dates) - 1
+    chunk_periods = chunk_periods or periods
+    for first in range(0, periods, chunk_periods):
+        last = min(first + chunk_periods, periods)
+        chunk_dates = rebalance_dates[first:last + 1]
+        run_end = last == periods
+        if factor_names:
+            factor_values = load_factor_values(factor_names, rebalance_dates[first:last], universe_tickers, fetch_factor_prices)
+
+        rankings = []
+        for i in range(first, last):
             print("Rebalance No:", i)
-            year_cutoff = rebalance_dates[i].year
-            period_start = rebalance_dates[i].strftime('%Y-%m-%d')
-            period_end = rebalance_dates[i + 1].strftime('%Y-%m-%d')
-
-            fundamentals_df = fetch_fundamentals(year_cutoff, config)
+            fundamentals_df = fundamentals_by_date.get(rebalance_dates[i])
+            if fundamentals_df is not None:
+                fundamentals_df = universe.restrict(fundamentals_df, rebalance_dates[i])
+            if fundamentals_df is None or fundamentals_df.empty:
+                # Nothing published yet or nothing in the universe: the period is held in cash
+                print(f"No companies match the filter criteria on {rebalance_dates[i].date()}, holding cash")
+                rankings.append(None)
+                continue
+            if factor_names:
+                fundamentals_df = fundamentals_df.merge(factor_values[rebalance_dates[i]], on='ticker', how='left')
             top_ranked_df,tickers = ranking_logic(fundamentals_df, config)
 
-            for _, row in top_ranked_df.iterrows():
-                top_ranked_records.append({
-                    "run_id": run_id,
-                    "date": period_start,
-                    "ticker": row["ticker"],
-                    "composite_rank": row["composite_rank"],
-                    "roce": row["roce"],
-                    "roe": row["roe"],
-                    "market_cap": row["market_cap"]
-                })
-
-            print(f"Period: {period_start} to {period_end}")
             print(f"Fundamentals columns: {len(fundamentals_df)}")
             print(f"Top-ranked tickers: {tickers}")
-            
+            rankings.append(top_ranked_df)
+
+        # One price matrix for the chunk. Inside a run the chunk also needs the
+        # first bars after its last date, where the next chunk's first fill is.
+        chunk_tickers = list(dict.fromkeys(
+            ticker for top_ranked_df in rankings if top_ranked_df is not None for ticker in top_ranked_df['ticker']
+        ))
+        if chunk_tickers:
+            load_end = chunk_dates[-1] + pd.Timedelta(days=fill_days + (0 if run_end else 10))
+            bars = load_price_bars(chunk_tickers, chunk_dates[0] - lookback, load_end, EXECUTION_FIELDS[config.execution_price])
+            price_matrix = bars["Close"]
+            fill_matrix = execution_matrix(bars, config)
+            del bars
+            # Rebalance dates become row numbers once; periods are sliced by position
+            rows = map_to_rows(chunk_dates, price_matrix.index, run_end)
+            fill_rows = np.minimum(rows + fill_offset, len(price_matrix) - 1)
+
+        # Tradable names and prices of every period first, so sizing solves the chunk as one stack
+        plans = []
+        for i, top_ranked_df in enumerate(rankings):
+            if top_ranked_df is None:
+                plans.append({"ranking": None})
+                continue
+            # A period holds from one rebalance fill to the next (closes by default)
+            columns = price_matrix.columns.get_indexer(top_ranked_df['ticker'])
+            price_data = price_matrix.iloc[fill_rows[i]:fill_rows[i + 1] + 1, columns]
+            fills = fill_matrix.iloc[[fill_rows[i], fill_rows[i + 1]], columns]
+
+            # Holdings are decided on what is known at the fill: picks without a
+            # price there are dropped and flagged. Later gaps are not looked at, so
+            # a name that stops trading is held at, and exits at, its last price.
+            untradable = price_data.iloc[0].isna() | fills.iloc[0].isna()
+            missing = price_data.columns[untradable].tolist()
+            price_data = price_data.loc[:, ~untradable].ffill()
+            fills = fills.loc[:, ~untradable].copy()
+            fills.iloc[-1] = fills.iloc[-1].fillna(price_data.iloc[-1])
+
+            trailing_prices = None
+            if trailing_sizing and not price_data.empty:
+                lookback_row = price_matrix.index.searchsorted(chunk_dates[i] - lookback)
+                trailing_prices = price_matrix.iloc[lookback_row:rows[i], price_matrix.columns.get_indexer(price_data.columns)]
+            plans.append({"ranking": top_ranked_df, "prices": price_data, "fills": fills,
+                          "missing": missing, "trailing": trailing_prices})
+
+        sized = [plan for plan in plans if plan["ranking"] is not None and not plan["prices"].empty]
+        weights_by_period = allocate_weights(
+            [plan["ranking"] for plan in sized],
+            [plan["prices"].columns.tolist() for plan in sized],
+            config,
+            [plan["trailing"] for plan in sized] if trailing_sizing else None,
+        )
+        for plan, weights in zip(sized, weights_by_period):
+            plan["weights"] = weights
 
-            try:
-                price_data = safe_download(tickers, period_start, period_end)
+        for i, plan in enumerate(plans):
+            period_start = chunk_dates[i].strftime('%Y-%m-%d')
+            period_end = chunk_dates[i + 1].strftime('%Y-%m-%d')
+            print(f"Period: {period_start} to {period_end}")
 
-            except Exception:
+            if plan["ranking"] is None:
+                prev_weights = None
+                yield {
+                    "date": period_end,
+                    "value": round(capital, 2),
+                    "turnover": 0.0,
+                    "costs": 0.0,
+                    "status": "skipped",
+                    "missing": [],
+                    "reason": "no_fundamentals"
+                }
                 continue
 
-            if isinstance(price_data, pd.Series):
-                price_data = price_data.to_frame()
+            top_ranked_df, price_data, fills, missing = plan["ranking"], plan["prices"], plan["fills"], plan["missing"]
+
+            buffers["top_companies"].append(
+                date=period_start,
+                ticker=top_ranked_df["ticker"].to_numpy(),
+                composite_rank=top_ranked_df["composite_rank"].to_numpy(dtype=float),
+                roce=top_ranked_df["roce"].to_numpy(dtype=float),
+                roe=top_ranked_df["roe"].to_numpy(dtype=float),
+                market_cap=top_ranked_df["market_cap"].to_numpy(dtype=float)
+            )
 
-            # Drop tickers with missing data in the period
-            price_data = price_data.dropna(axis=1, how='any')
             if price_data.empty:
+                # Nothing tradable: hold cash until the next rebalance, visibly
+                print(f"No usable prices for {period_start}, holding cash")
+                prev_weights = None
+                yield {
+                    "date": period_end,
+                    "value": round(capital, 2),
+                    "turnover": 0.0,
+                    "costs": 0.0,
+                    "status": "skipped",
+                    "missing": missing,
+                    "reason": "no_prices"
+                }
                 continue
 
             print(f"Price data after dropna columns: {price_data.columns.tolist()}")
-            print(f"Price data is empty? {price_data.empty}")
+            weights = plan["weights"]
+
+            start_prices = fills.iloc[0]
+            end_prices = fills.iloc[-1]
+
+            # Trading costs on the move from last period's drifted weights
+            executed_weights, turnover, cost = rebalance_costs(prev_weights, pd.Series(weights, dtype=float), capital, config)
+            invested = capital - cost
+
+            # Shares, values and returns per ticker as aligned arrays
+            tickers_this_period = price_data.columns
+            weight_values = executed_weights.reindex(tickers_this_period).to_numpy(dtype=float)
+            start_values = start_prices.to_numpy(dtype=float)
+            end_values = end_prices.to_numpy(dtype=float)
+            tradable = start_values != 0
+            safe_start = np.where(tradable, start_values, 1.0)
+            shares = np.where(tradable, invested * weight_values / safe_start, 0.0)
+            position_values = shares * end_values
+            returns_pct = np.where(tradable, (end_values - start_values) / safe_start * 100, 0.0)
+            end_value = position_values.sum()
+
+            # Ties resolve like a stable descending sort: first best, last worst
+            top_winner = int(np.argmax(returns_pct))
+            top_loser = len(returns_pct) - 1 - int(np.argmin(returns_pct[::-1]))
+            buffers["top_movers"].append(
+                date=period_start,
+                top_winner=tickers_this_period[top_winner],
+                top_winner_return=round(returns_pct[top_winner], 2),
+                top_loser=tickers_this_period[top_loser],
+                top_loser_return=round(returns_pct[top_loser], 2)
+            )
 
-            weights=allocate_weights(top_ranked_df,price_data.columns.tolist(), config)
+            buffers["portfolio_composition"].append(
+                date=period_start,
+                ticker=tickers_this_period.to_numpy(),
+                weight=weight_values,
+                shares=shares,
+                start_price=start_values,
+                end_price=end_values,
+                value=position_values,
+                return_pct=returns_pct
+            )
 
-            # Get start and end prices
-            try:
-                start_prices = price_data.iloc[0]
-                end_prices = price_data.iloc[-1]
-            except Exception:
-                continue
+            print("Capital Values")
+            capital = end_value
+            prev_weights = drifted_weights(pd.Series(shares, index=tickers_this_period), end_prices)
+            yield {
+                "date": price_data.index[-1].strftime('%Y-%m-%d'),
+                "value": round(end_value, 2),
+                "turnover": round(turnover, 4),
+                "costs": round(cost, 2),
+                "status": "partial" if missing else "ok",
+                "missing": missing,
+                "reason": "missing_prices" if missing else None
+            }
 
-            # Calculate number of shares per ticker
-            shares = {
-                    ticker: (capital * weights[ticker]) / start_prices[ticker]
-                    if start_prices[ticker] != 0 else 0
-                    for ticker in weights
-                }
-            end_value = sum(shares[ticker] * end_prices[ticker] for ticker in weights)
 
-            returns_this_period = {
-                ticker: ((end_prices[ticker] - start_prices[ticker]) / start_prices[ticker]) * 100
-                if start_prices[ticker] != 0 else 0
-                for ticker in weights
-            }
+def export_buffers(buffers, run_id, append=False):
+    written = {}
+    for name, buffer in buffers.items():
+        buffer_df = buffer.to_frame(run_id=run_id) if name != "top_movers" else buffer.to_frame()
+        buffer_df.to_csv(f"{export_dir}/{run_id}_{name}.csv", index=False, mode="a" if append else "w", header=not append)
+        buffer.clear()
+        written[name] = buffer_df
+    return written
 
-            period_winners = sorted(returns_this_period.items(), key=lambda x: x[1], reverse=True)
-            top_winner = period_winners[0]
-            top_loser = period_winners[-1]
-
-            winners_and_losers.append({
-                "date": period_start,
-                "top_winner": {"ticker": top_winner[0], "return": round(top_winner[1], 2)},
-                "top_loser": {"ticker": top_loser[0], "return": round(top_loser[1], 2)},
-            })
-
-            
-            tickers_this_period = price_data.columns.tolist()
-            for ticker in tickers_this_period:
-                portfolio_composition_records.append({
-                    "run_id": run_id,
-                    "date": period_start,
-                    "ticker": ticker,
-                    "weight": weights[ticker],
-                    "shares": shares[ticker],
-                    "start_price": start_prices[ticker],
-                    "end_price": end_prices[ticker],
-                    "value": shares[ticker] * end_prices[ticker],
-                    "return_pct": ((end_prices[ticker] - start_prices[ticker]) / start_prices[ticker]) * 100 if start_prices[ticker] != 0 else 0
-                })
 
-            
+def curve_payload(curve_df, column, columnar):
+    # Columnar: {"date": [...], column: [...]} instead of one dict per point
+    if columnar:
+        return {"date": curve_df["date"].tolist(), column: curve_df[column].tolist()}
+    return curve_df[["date", column]].to_dict(orient="records")
 
-            print("Capital Values")
-            capital = end_value
-            portfolio_history.append({
-                "date": price_data.index[-1].strftime('%Y-%m-%d'),
-                "value": round(end_value, 2)
-            })
-
-        portfoliocsv_df = pd.DataFrame(portfolio_composition_records)
-        portfoliocsv_df.to_csv(f"data/exports/{run_id}_portfolio_composition.csv", index=False)
-
-        top_companies_df = pd.DataFrame(top_ranked_records)
-        top_companies_df.to_csv(f"data/exports/{run_id}_top_companies.csv", index=False)
-
-        top_movers_df = pd.DataFrame([
-            {
-                "date": entry["date"],
-                "top_winner": entry["top_winner"]["ticker"],
-                "top_winner_return": entry["top_winner"]["return"],
-                "top_loser": entry["top_loser"]["ticker"],
-                "top_loser_return": entry["top_loser"]["return"],
-            }
-            for entry in winners_and_losers
-        ])
-        top_movers_df.to_csv(f"data/exports/{run_id}_top_movers.csv", index=False)
+
+def data_quality_payload(portfolio_df):
+    # Per-period coverage: "ok", "partial" (some picks had no price at the rebalance fill and were dropped)
+    # or "skipped" (capital held as cash), with the reason: "missing_prices",
+    # "no_prices" or "no_fundamentals" (nothing published or screened on that date)
+    if portfolio_df.empty:
+        return {"periods": 0, "ok": 0, "partial": 0, "skipped": 0, "flags": []}
+    counts = portfolio_df["status"].value_counts()
+    flagged = portfolio_df[portfolio_df["status"] != "ok"]
+    return {
+        "periods": len(portfolio_df),
+        "ok": int(counts.get("ok", 0)),
+        "partial": int(counts.get("partial", 0)),
+        "skipped": int(counts.get("skipped", 0)),
+        "flags": flagged[["date", "status", "reason", "missing"]].to_dict(orient="records"),
+    }
+
+
+ARTIFACT_NAMES = ["portfolio_composition", "top_companies", "config", "top_movers", "equity_curve"]
+
+
+def run_artifacts(run_id):
+    paths = {name: f"{export_dir}/{run_id}_{name}.csv" for name in ARTIFACT_NAMES}
+    # A profiled run has one profile file, .prof or .txt depending on the mode
+    for mode in PROFILE_MODES:
+        if os.path.exists(profile_path(export_dir, run_id, mode)):
+            paths["profile"] = profile_path(export_dir, run_id, mode)
+    return {name: path for name, path in paths.items() if os.path.exists(path)}
+
+
+def retention_pass(max_age_days, max_runs, compact_after_days):
+    # Own transaction; deletes and zips export files, so keep it off the event loop
+    with engine.begin() as conn:
+        return apply_retention(conn, export_dir, max_age_days, max_runs, compact_after_days)
+
+
+def remove_run_files(run_id):
+    with engine.begin() as conn:
+        return delete_run(conn, run_id)
+
+
+def record_failed_run(run_id, config, error):
+    # Best effort: a registry failure must not hide the original error
+    try:
+        with engine.begin() as conn:
+            register_run(conn, run_id, config, artifacts=run_artifacts(run_id), status="failed", error=error)
+    except Exception as registry_error:
+        print(f"Could not register failed run {run_id}: {registry_error}")
+
+
+@app.post("/run-backtest")
+@limiter.limit(RATE_LIMIT)
+def run_backtest(request: Request,config: BacktestConfig, streaming: bool = False, columnar: bool = False, max_points: int = None,
+                 profile: str = None, profile_top: int = 25, profile_sort: str = "cumulative"):
+    # Timestamp for readability, suffix so runs started in the same second don't collide
+    run_id = f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}_{uuid.uuid4().hex[:6]}"
+
+    # Opt-in profiling via ?profile=cprofile|sample or the X-Profile header
+    profile = profile or request.headers.get("X-Profile")
+    if profile in ("1", "true"):
+        profile = "cprofile"
+    if profile and (profile not in PROFILE_MODES or profile_sort not in SORT_KEYS):
+        raise HTTPException(status_code=400, detail=f"profile must be one of {list(PROFILE_MODES)}, profile_sort one of {list(SORT_KEYS)}")
+    # Equity and drawdown curves are downsampled together
+    if max_points and max_points < min_points(2):
+        raise HTTPException(status_code=400, detail=f"max_points must be at least {min_points(2)}")
+    check_universe(config.universe)
+    profiler = start_profiler(profile) if profile else None
+    profile_report = None
+
+    try:
+        exportconfig(run_id,config)
+        rebalance_dates = fetch_rebalance_dates(config.start_date, config.end_date, config)
+        print("-" * 50)
+        print("Rebalance dates:", rebalance_dates)
+        print("No of rebalances:", len(rebalance_dates))
+        
+        portfolio_history = []
+        buffers = new_run_buffers()
+        if streaming:
+            # Flush every period to the export files; only the equity series stays in memory
+            for point in iter_backtest_periods(config, rebalance_dates, buffers, STREAM_CHUNK_PERIODS):
+                export_buffers(buffers, run_id, append=bool(portfolio_history))
+                portfolio_history.append(point)
+            # Rows of periods skipped after the last flush (or the headers if nothing ran)
+            export_buffers(buffers, run_id, append=bool(portfolio_history))
+            top_movers_df = pd.read_csv(f"{export_dir}/{run_id}_top_movers.csv")
+        else:
+            portfolio_history = list(iter_backtest_periods(config, rebalance_dates, buffers))
+            top_movers_df = export_buffers(buffers, run_id)["top_movers"]
+        winners_and_losers = movers_payload(top_movers_df)
 
         # Step 6: Metrics
         portfolio_df = pd.DataFrame(portfolio_history)
         metrics = calculate_metrics(portfolio_df)
+        if not portfolio_df.empty:
+            metrics["total_costs"] = round(portfolio_df["costs"].sum(), 2)
+            metrics["avg_turnover"] = round(portfolio_df["turnover"].mean(), 4)
         portfolio_df["drawdown"] = (portfolio_df["value"] / portfolio_df["value"].cummax()) - 1
+        data_quality = data_quality_payload(portfolio_df)
+        portfolio_df.assign(
+            missing=portfolio_df.get("missing", pd.Series(dtype=object)).map(";".join)
+        ).to_csv(f"{export_dir}/{run_id}_equity_curve.csv", index=False)
+
+        # Stopped before registering so the profile is listed with the run
+        if profiler:
+            profile_report = finish_profiler(profiler, export_dir, run_id, profile_top, profile_sort)
+            profiler = None
+
+        with engine.begin() as conn:
+            register_run(conn, run_id, config, metrics, run_artifacts(run_id))
+        # Housekeeping runs after the registration is committed; a failure there
+        # is logged and does not fail (or unregister) this run
+        try:
+            retention_pass(RUN_RETENTION_DAYS, RUN_RETENTION_MAX_RUNS, RUN_COMPACT_AFTER_DAYS)
+        except Exception as e:
+            print(f"Retention failed after run {run_id}: {e}")
 
+        # Optional shape-preserving downsampling of the curves sent to the chart
+        curve_df = portfolio_df
+        if max_points and not portfolio_df.empty:
+            days = pd.to_datetime(portfolio_df["date"]).values.astype("datetime64[D]").astype(float)
+            curve_df = portfolio_df.iloc[downsample_rows([portfolio_df["value"], portfolio_df["drawdown"]], max_points, days)]
 
         return {
             "run_id": run_id,
-            "equity_curve": portfolio_df[["date", "value"]].to_dict(orient="records"),
-            "drawdown_curve": portfolio_df[["date", "drawdown"]].round(4).to_dict(orient="records"),
+            "equity_curve": curve_payload(curve_df, "value", columnar),
+            "drawdown_curve": curve_payload(curve_df.round({"drawdown": 4}), "drawdown", columnar),
             "metrics": metrics,
-            "top_movers": winners_and_losers
+            "top_movers": winners_and_losers,
+            "data_quality": data_quality,
+            **({"profile": profile_report} if profile_report else {})
         }
 
     except Exception as e:
         print(e)
+        if profiler:
+            # Keep the profile of a failing run too, it is often the slow one
+            finish_profiler(profiler, export_dir, run_id, profile_top, profile_sort)
+        record_failed_run(run_id, config, str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/export-backtest")
 def export_backtest(run_id: str):
     try:
         print("run id", run_id)
-        folder = "data/exports"
-        files = [
-            f"{folder}/{run_id}_portfolio_composition.csv",
-            f"{folder}/{run_id}_top_companies.csv",
-            f"{folder}/{run_id}_config.csv",
-            f"{folder}/{run_id}_top_movers.csv"
-        ]
+        with engine.connect() as conn:
+            run = get_run(conn, run_id)
+
+        # Compacted runs are already a single archive
+        if run and "archive" in run["artifacts"]:
+            return FileResponse(
+                run["artifacts"]["archive"],
+                media_type="application/x-zip-compressed",
+                filename=f"{run_id}_backtest_export.zip"
+            )
+
+        if run:
+            files = list(run["artifacts"].values())
+        else:
+            # Runs from before the registry existed
+            files = [f"{export_dir}/{run_id}_{name}.csv" for name in ARTIFACT_NAMES]
 
         # Create an in-memory ZIP file
         zip_buffer = BytesIO()
@@ -454,7 +872,7 @@ def export_backtest(run_id: str):
 
 
 @app.post("/compute-nifty")
-@limiter.limit("5/minute")
+@limiter.limit(RATE_LIMIT)
 def compute_nifty(request: Request, config: BacktestConfig):
     try:
         rebalance_dates = fetch_rebalance_dates(config.start_date, config.end_date, config)
@@ -462,7 +880,7 @@ def compute_nifty(request: Request, config: BacktestConfig):
         print("Nifty50 Rebalance Dates:", rebalance_dates)
         print(type(config.start_date), config.end_date)
 
-        data = yf.download("^NSEI", start=config.start_date, end=config.end_date)["Close"]
+        data = download_prices(["^NSEI"], config.start_date, config.end_date)
         print(data.head())
         if isinstance(data, pd.DataFrame):
             data = data["^NSEI"] 
@@ -486,7 +904,7 @@ def compute_nifty(request: Request, config: BacktestConfig):
 
                 result.append({
                     "date": date.strftime('%Y-%m-%d'),
-                    "value": round(close_price, 2) if isinstance(close_price, (int, float, np.number)) else 0
+                    "value": round(float(close_price), 2) if isinstance(close_price, (int, float, np.number)) else 0
                 })
 
                 print(date,close_price)
@@ -505,3 +923,161 @@ def compute_nifty(request: Request, config: BacktestConfig):
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/robustness")
+@limiter.limit(RATE_LIMIT)
+def robustness(request: Request, params: RobustnessConfig):
+    if params.method not in METHODS:
+        raise HTTPException(status_code=400, detail=f"Unknown method '{params.method}'. Use one of: {', '.join(METHODS)}")
+    if not 0 < params.simulations <= MAX_SIMULATIONS:
+        raise HTTPException(status_code=400, detail=f"simulations must be between 1 and {MAX_SIMULATIONS}")
+
+    try:
+        with engine.connect() as conn:
+            run = get_run(conn, params.run_id)
+        if run:
+            composition_df = read_artifact_csv(run, "portfolio_composition")
+        else:
+            composition_df = load_composition(params.run_id, export_dir)
+    except (FileNotFoundError, KeyError):
+        raise HTTPException(status_code=404, detail=f"No exports found for run {params.run_id}")
+
+    try:
+        # Observed from the rebalance dates, so weekly or custom schedules annualise correctly
+        observed_periods_per_year = periods_per_year(pd.DatetimeIndex(pd.to_datetime(composition_df["date"].unique())).sort_values())
+        return run_robustness(
+            composition_df,
+            observed_periods_per_year,
+            params.method,
+            params.simulations,
+            params.seed,
+            {"block_size": params.block_size, "min_periods": params.min_periods, "subset_fraction": params.subset_fraction},
+            workers=params.workers,
+        )
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/screen")
+async def screen(params: ScreenConfig):
+    # Point-in-time screen for a single date, served from the async pool
+    if params.ranking and parse_factors(params.ranking):
+        raise HTTPException(status_code=400, detail="Price factors are only available in /run-backtest.")
+    check_universe(params.universe)
+
+    try:
+        as_of = pd.Timestamp(params.as_of)
+        async with async_engine.connect() as conn:
+            result = await conn.execute(latest_fundamentals_query(as_of, params.reporting_lag_days))
+            rows, columns = result.fetchall(), list(result.keys())
+
+        # Pandas work and the universe index are CPU-bound; keep them off the event loop
+        def rank():
+            universe = cached_universe(params.universe)
+            history_df = pd.DataFrame(rows, columns=columns)
+            screened_df = screen_fundamentals(history_df, [as_of], params).get(as_of)
+            if screened_df is None:
+                return []
+            screened_df = universe.restrict(screened_df, as_of)
+            if params.ranking:
+                screened_df, _ = ranking_logic(screened_df, params)
+            elif params.portfolio_size:
+                screened_df = screened_df.head(params.portfolio_size)
+            screened_df = screened_df.drop(columns=["rebalance_date", "available_on"])
+            return screened_df.astype(object).where(screened_df.notna(), None).to_dict(orient="records")
+
+        companies_found = await run_in_threadpool(rank)
+        return {"as_of": as_of.strftime('%Y-%m-%d'), "count": len(companies_found), "companies": companies_found}
+
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/runs")
+async def runs(limit: int = 50, offset: int = 0, sort: str = "created_at", order: str = "desc",
+               status: str = None, rebalance_frequency: str = None, position_sizing: str = None):
+    # Summaries straight from the registry; no export file is opened
+    if sort not in SORTABLE:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(SORTABLE)}")
+    async with async_engine.connect() as conn:
+        total, run_summaries = await conn.run_sync(
+            list_runs, min(limit, 500), offset, sort, order != "asc", status, rebalance_frequency, position_sizing
+        )
+    return {"total": total, "runs": run_summaries}
+
+
+@app.get("/runs/{run_id}")
+async def run_detail(run_id: str):
+    async with async_engine.connect() as conn:
+        run = await conn.run_sync(get_run, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return run
+
+
+@app.delete("/runs/{run_id}")
+async def remove_run(run_id: str):
+    # Removes export files too, so it runs on a worker thread
+    deleted = await run_in_threadpool(remove_run_files, run_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+    return {"deleted": run_id}
+
+
+@app.post("/runs/retention")
+async def run_retention(max_age_days: int = RUN_RETENTION_DAYS, max_runs: int = RUN_RETENTION_MAX_RUNS,
+                        compact_after_days: int = RUN_COMPACT_AFTER_DAYS):
+    # Zipping and deleting export files would block the event loop, so this runs on a worker thread
+    return await run_in_threadpool(retention_pass, max_age_days, max_runs, compact_after_days)
+
+
+MAX_COMPARE_RUNS = 10
+
+
+@app.get("/compare")
+@limiter.limit(RATE_LIMIT)
+async def compare_runs(request: Request, run_ids: str, benchmark: str = "^NSEI", max_points: int = 500):
+    # run_ids is comma separated; benchmark is a yfinance symbol or "none"
+    names = list(dict.fromkeys(r.strip() for r in run_ids.split(',') if r.strip()))
+    if not names or len(names) > MAX_COMPARE_RUNS:
+        raise HTTPException(status_code=400, detail=f"Pass between 1 and {MAX_COMPARE_RUNS} run_ids")
+    # An equity and a drawdown column per run and for the benchmark
+    columns = 2 * (len(names) + (benchmark.lower() != "none"))
+    if max_points < min_points(columns):
+        raise HTTPException(status_code=400, detail=f"max_points must be at least {min_points(columns)} for this comparison")
+
+    curves = {}
+    async with async_engine.connect() as conn:
+        for run_id in names:
+            run = await conn.run_sync(get_run, run_id)
+            if run is None:
+                raise HTTPException(status_code=404, detail=f"Run {run_id} not found")
+            try:
+                equity_df = await run_in_threadpool(read_artifact_csv, run, "equity_curve")
+            except (FileNotFoundError, KeyError):
+                raise HTTPException(status_code=404, detail=f"Run {run_id} has no equity curve export")
+            curves[run_id] = equity_df.set_index(pd.to_datetime(equity_df["date"]))["value"]
+
+    try:
+        benchmark_curve = None
+        if benchmark.lower() != "none":
+            start = min(curve.index[0] for curve in curves.values())
+            end = max(curve.index[-1] for curve in curves.values()) + pd.Timedelta(days=1)
+            # Include a few days before the first date so the as-of lookup has a value
+            # Awaited, so Yahoo retries and backoff don't hold a worker thread
+            benchmark_data = await market_data.fetch_async([benchmark], (start - pd.Timedelta(days=10)).strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))
+            benchmark_curve = benchmark_data["Close"].iloc[:, 0].dropna()
+
+        def compare():
+            aligned = align_curves(curves, benchmark_curve)
+            reference = "benchmark" if "benchmark" in aligned else names[0]
+            return comparison_payload(aligned, reference, max_points)
+
+        return await run_in_threadpool(compare)
+
+    except Exception as e:
+        print(e)
+        raise HTTPException(status_code=500, detail=str(e))
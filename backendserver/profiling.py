@@ -0,0 +1,131 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+
+# ------------------ Request Profiling ------------------
+# Opt-in per request. "cprofile" traces every call (exact counts, noticeable
+# overhead), "sample" snapshots the request thread's stack every few
+# milliseconds (approximate, cheap). Nothing here runs unless asked for.
+
+PROFILE_MODES = {"cprofile": "prof", "sample": "txt"}
+SORT_KEYS = {"cumulative": "cumulative_s", "self": "self_s"}
+SAMPLE_INTERVAL = 0.005
+
+
+def profile_path(folder, run_id, mode):
+    return os.path.join(folder, f"{run_id}_profile.{PROFILE_MODES[mode]}")
+
+
+def function_label(filename, line, name):
+    # Last two path components are enough to tell pandas/io/sql.py from main.py
+    short = "/".join(filename.replace("\\", "/").split("/")[-2:])
+    return f"{short}:{line}({name})"
+
+
+class TracingProfiler:
+    mode = "cprofile"
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+
+    def save(self, path):
+        self.profiler.dump_stats(path)
+
+    def hot_functions(self, top_n, sort):
+        stats = pstats.Stats(self.profiler).stats
+        rows = [
+            {
+                "function": function_label(*func),
+                "calls": primitive_calls,
+                "self_s": round(self_time, 4),
+                "cumulative_s": round(cumulative_time, 4),
+            }
+            for func, (primitive_calls, _, self_time, cumulative_time, _) in stats.items()
+        ]
+        return sorted(rows, key=lambda row: row[sort], reverse=True)[:top_n]
+
+
+class SamplingProfiler:
+    mode = "sample"
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def start(self):
+        # Samples the thread that starts the profiler, i.e. the request's worker
+        self.target = threading.get_ident()
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+
+    def sample(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(function_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.sampler.join()
+
+    def save(self, path):
+        # Collapsed stacks, the input format of flamegraph.pl and speedscope
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def hot_functions(self, top_n, sort):
+        self_samples, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack[-1]] += count
+            for function in set(stack):
+                inclusive[function] += count
+        rows = [
+            {
+                "function": function,
+                "calls": None,
+                "self_s": round(self_samples[function] * self.interval, 4),
+                "cumulative_s": round(inclusive[function] * self.interval, 4),
+            }
+            for function in inclusive
+        ]
+        return sorted(rows, key=lambda row: row[sort], reverse=True)[:top_n]
+
+
+def start_profiler(mode):
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode}. Use one of {list(PROFILE_MODES)}")
+    profiler = TracingProfiler() if mode == "cprofile" else SamplingProfiler()
+    profiler.started = time.perf_counter()
+    profiler.start()
+    return profiler
+
+
+def finish_profiler(profiler, folder, run_id, top_n=25, sort="cumulative"):
+    profiler.stop()
+    wall_time = time.perf_counter() - profiler.started
+    path = profile_path(folder, run_id, profiler.mode)
+    profiler.save(path)
+    return {
+        "mode": profiler.mode,
+        "path": path,
+        "wall_s": round(wall_time, 3),
+        "top": profiler.hot_functions(top_n, SORT_KEYS[sort]),
+    }
@@ -0,0 +1,341 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FetchTimeout
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from barstore import BarStore, OHLCV_FIELDS
+
+
+# ------------------ Market Data Providers ------------------
+# Every provider returns daily OHLCV bars as one frame with (field, ticker)
+# columns, the layout yf.download uses for several tickers. The end date is
+# exclusive. Tickers a provider has no data for are simply absent, so a chain
+# can ask the next provider for them; a provider that fails outright raises
+# ProviderError so the chain moves on. Values are float32 whatever the source,
+# so a run gives the same numbers whether its bars came from Yahoo or the store.
+# fetch is blocking and meant for the worker threads that run the backtests;
+# async handlers await fetch_async, whose backoff does not hold a thread.
+
+
+class ProviderError(Exception):
+    pass
+
+
+class ProviderUnavailable(ProviderError):
+    pass
+
+
+def to_ohlcv_frame(frames):
+    # {ticker: DataFrame of OHLCV columns} -> (field, ticker) columns
+    frames = {ticker: frame for ticker, frame in frames.items() if not frame.empty}
+    if not frames:
+        return pd.DataFrame(columns=pd.MultiIndex.from_tuples([], names=["Price", "Ticker"]))
+    data = pd.concat(frames, axis=1, names=["Ticker", "Price"]).swaplevel(axis=1)
+    return data.sort_index(axis=1).sort_index()
+
+
+def slice_dates(frame, start, end):
+    index = pd.DatetimeIndex(frame.index)
+    return frame[(index >= pd.Timestamp(start)) & (index < pd.Timestamp(end))]
+
+
+class YFinanceProvider:
+    name = "yfinance"
+
+    def fetch(self, tickers, start, end):
+        print("Fetching from Yahoo")
+        data = yf.download(tickers=tickers, start=start, end=end)
+        # yf.download reports failures by printing and returning nothing
+        if data is None or data.empty:
+            raise ProviderError(f"yfinance returned no rows for {tickers}")
+        if not isinstance(data.columns, pd.MultiIndex):
+            data.columns = pd.MultiIndex.from_product([data.columns, [tickers[0]]])
+        # Tickers yfinance failed on come back as all-NaN columns
+        present = data["Close"].notna().any()
+        return data.loc[:, data.columns.get_level_values(1).isin(present[present].index)]
+
+
+class LocalProvider:
+    # One {ticker}.parquet or {ticker}.csv per ticker with a Date column
+    name = "local"
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def read_ticker(self, ticker):
+        for extension, reader in [(".parquet", pd.read_parquet), (".csv", pd.read_csv)]:
+            path = os.path.join(self.folder, f"{ticker}{extension}")
+            if os.path.exists(path):
+                frame = reader(path)
+                if "Date" in frame.columns:
+                    frame = frame.set_index("Date")
+                frame.index = pd.to_datetime(frame.index)
+                return frame.reindex(columns=OHLCV_FIELDS)
+        return None
+
+    def fetch(self, tickers, start, end):
+        frames = {}
+        for ticker in tickers:
+            # A corrupt file or a parquet file without pyarrow installed
+            try:
+                frame = self.read_ticker(ticker)
+            except Exception as e:
+                raise ProviderError(f"local: could not read {ticker}: {e}") from e
+            if frame is not None:
+                frames[ticker] = slice_dates(frame, start, end)
+        return to_ohlcv_frame(frames)
+
+
+class MemoryProvider:
+    # Fixture provider for tests and load tests: {ticker: OHLCV DataFrame}
+    name = "memory"
+
+    def __init__(self, frames):
+        self.frames = {ticker: frame.reindex(columns=OHLCV_FIELDS) for ticker, frame in frames.items()}
+
+    def fetch(self, tickers, start, end):
+        return to_ohlcv_frame({
+            ticker: slice_dates(self.frames[ticker], start, end) for ticker in tickers if ticker in self.frames
+        })
+
+
+class BarStoreProvider:
+    # Memory-mapped float32 bars saved by earlier fetches, see barstore.py
+    name = "store"
+
+    def __init__(self, store):
+        self.store = store
+
+    def fetch(self, tickers, start, end):
+        frames = {}
+        for ticker in tickers:
+            try:
+                frame = self.store.read(ticker, start, end)
+            except Exception as e:
+                raise ProviderError(f"store: could not read {ticker}: {e}") from e
+            if frame is not None:
+                frames[ticker] = frame
+        return to_ohlcv_frame(frames)
+
+
+# ------------------ Resilience ------------------
+# Upstream calls run on a dedicated pool so a timed-out call never holds the
+# caller past its timeout: the caller stops waiting, the stuck call finishes in
+# the background.
+
+_fetch_pool = ThreadPoolExecutor(max_workers=int(os.getenv("PRICE_FETCH_WORKERS", 8)))
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failed fetches and lets a single
+    # trial call through once `reset_after` seconds have passed
+    def __init__(self, threshold=5, reset_after=60.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        with self.lock:
+            if self.state == "open":
+                return False
+            if self.state == "half_open":
+                # Restart the clock so concurrent callers don't all probe at once
+                self.opened_at = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+class ResilientProvider:
+    # Retries with backoff inside one overall deadline. A call that times out
+    # keeps running on _fetch_pool, so the next attempt waits on it again
+    # instead of stacking another call behind it.
+    def __init__(self, provider, retries=3, timeout=30.0, delay=1.0, breaker=None, deadline=60.0):
+        self.provider = provider
+        self.name = provider.name
+        self.retries = retries
+        self.timeout = timeout
+        self.delay = delay
+        self.deadline = deadline
+        self.breaker = breaker or CircuitBreaker()
+
+    def check_breaker(self):
+        if not self.breaker.allow():
+            raise ProviderUnavailable(f"{self.name}: circuit open, skipping upstream call")
+
+    def next_call(self, call, tickers, start, end):
+        # Only a finished (failed) call is replaced by a new one
+        if call is None or call.done():
+            call = _fetch_pool.submit(self.provider.fetch, tickers, start, end)
+        return call
+
+    def backoff(self, attempt, error, give_up_at):
+        # Seconds to wait before the next attempt, or None when there is none
+        remaining = give_up_at - time.monotonic()
+        if attempt + 1 >= self.retries or remaining <= 0:
+            return None
+        wait_time = min(self.delay * (2 ** attempt) + random.random() * self.delay, remaining)
+        print(f"[{self.name} retry {attempt + 1}] {error} | Retrying in {round(wait_time, 2)}s...")
+        return wait_time
+
+    def give_up(self, tickers, attempts, error):
+        self.breaker.record_failure()
+        return ProviderUnavailable(f"{self.name}: failed to fetch {tickers} after {attempts} attempts ({error})")
+
+    def fetch(self, tickers, start, end):
+        self.check_breaker()
+        give_up_at = time.monotonic() + self.deadline
+        call = None
+        for attempt in range(self.retries):
+            call = self.next_call(call, tickers, start, end)
+            timeout = max(min(self.timeout, give_up_at - time.monotonic()), 0)
+            try:
+                data = call.result(timeout=timeout)
+                self.breaker.record_success()
+                return data
+            except FetchTimeout:
+                error = f"timed out after {round(timeout, 2)}s"
+            except Exception as e:
+                error = str(e)
+            wait_time = self.backoff(attempt, error, give_up_at)
+            if wait_time is None:
+                break
+            time.sleep(wait_time)
+        raise self.give_up(tickers, attempt + 1, error)
+
+    async def fetch_async(self, tickers, start, end):
+        # Same attempts and deadline as fetch; waiting never blocks the event loop
+        self.check_breaker()
+        give_up_at = time.monotonic() + self.deadline
+        call = None
+        for attempt in range(self.retries):
+            call = self.next_call(call, tickers, start, end)
+            timeout = max(min(self.timeout, give_up_at - time.monotonic()), 0)
+            try:
+                # Shielded: a timeout stops the wait, not the call
+                data = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(call)), timeout)
+                self.breaker.record_success()
+                return data
+            except asyncio.TimeoutError:
+                error = f"timed out after {round(timeout, 2)}s"
+            except Exception as e:
+                error = str(e)
+            wait_time = self.backoff(attempt, error, give_up_at)
+            if wait_time is None:
+                break
+            await asyncio.sleep(wait_time)
+        raise self.give_up(tickers, attempt + 1, error)
+
+
+class ProviderChain:
+    # Asks each provider in turn for the tickers still missing. With a cache
+    # (BarStore), bars from the other providers are written through to it.
+    def __init__(self, providers, cache=None):
+        self.providers = providers
+        self.cache = cache
+
+    def fetch(self, tickers, start, end):
+        parts, errors = [], []
+        missing = list(tickers)
+        for provider in self.providers:
+            if not missing:
+                break
+            try:
+                data = provider.fetch(missing, start, end)
+            except ProviderError as e:
+                print(e)
+                errors.append(str(e))
+                continue
+            if not data.empty:
+                data = data.astype(np.float32)
+                if self.cache is not None and not isinstance(provider, BarStoreProvider):
+                    self.write_through(data, start, end)
+                missing = self.collect(parts, data, missing)
+        return self.combine(parts, errors, tickers, missing)
+
+    async def fetch_async(self, tickers, start, end):
+        # For async handlers: Yahoo is awaited with non-blocking backoff, file
+        # reads and cache writes go to worker threads
+        parts, errors = [], []
+        missing = list(tickers)
+        for provider in self.providers:
+            if not missing:
+                break
+            try:
+                if hasattr(provider, "fetch_async"):
+                    data = await provider.fetch_async(missing, start, end)
+                else:
+                    data = await asyncio.to_thread(provider.fetch, missing, start, end)
+            except ProviderError as e:
+                print(e)
+                errors.append(str(e))
+                continue
+            if not data.empty:
+                data = data.astype(np.float32)
+                if self.cache is not None and not isinstance(provider, BarStoreProvider):
+                    await asyncio.to_thread(self.write_through, data, start, end)
+                missing = self.collect(parts, data, missing)
+        return self.combine(parts, errors, tickers, missing)
+
+    def collect(self, parts, data, missing):
+        # Keeps a provider's bars and returns the tickers still missing
+        parts.append(data)
+        found = set(data.columns.get_level_values(1))
+        return [ticker for ticker in missing if ticker not in found]
+
+    def combine(self, parts, errors, tickers, missing):
+        if not parts:
+            raise ProviderUnavailable("; ".join(errors) or f"No provider has data for {tickers}")
+        if missing:
+            print(f"No price data for {missing}")
+        return pd.concat(parts, axis=1).sort_index(axis=1).sort_index()
+
+    def write_through(self, data, start, end):
+        # A full disk or read-only volume must not fail the request
+        try:
+            self.cache.write_frame(data, start, end)
+        except Exception as e:
+            print(f"Could not cache bars: {e}")
+
+
+def build_provider(names, local_dir, store_dir=None, retries=3, timeout=30.0, deadline=60.0, breaker_threshold=5, breaker_reset=60.0):
+    # names: e.g. ["store", "local", "yfinance"]: bar store, then local files, then Yahoo
+    providers = []
+    store = None
+    for name in names:
+        if name == "store":
+            store = BarStore(store_dir)
+            providers.append(BarStoreProvider(store))
+        elif name == "local":
+            providers.append(LocalProvider(local_dir))
+        elif name == "yfinance":
+            providers.append(ResilientProvider(
+                YFinanceProvider(), retries=retries, timeout=timeout, deadline=deadline,
+                breaker=CircuitBreaker(breaker_threshold, breaker_reset),
+            ))
+        else:
+            raise ValueError(f"Unknown price provider: {name}")
+    return ProviderChain(providers, cache=store)
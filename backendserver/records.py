@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+
+# ------------------ Columnar Run Records ------------------
+# Per-period rows are appended as whole column batches into preallocated NumPy
+# arrays. Repeated strings (tickers, dates) are dictionary-encoded to int32 codes
+# and only expanded into categoricals when a DataFrame is built.
+
+
+class Dictionary:
+    def __init__(self):
+        self.values = []
+        self._index = pd.Index([], dtype=object)
+
+    def encode(self, values):
+        values = np.asarray(values, dtype=object)
+        # Only previously unseen values touch Python objects; the lookup is vectorized
+        unseen = pd.Index(pd.unique(values)).difference(self._index, sort=False)
+        if len(unseen):
+            self.values.extend(unseen.tolist())
+            self._index = pd.Index(self.values, dtype=object)
+        return self._index.get_indexer(values).astype(np.int32)
+
+    def decode(self, codes):
+        return pd.Categorical.from_codes(codes, categories=self._index)
+
+
+class ColumnarBuffer:
+    def __init__(self, schema, capacity=1024):
+        # schema: {column: numpy dtype, or a Dictionary for encoded string columns}
+        self.schema = schema
+        self.size = 0
+        self._columns = {
+            name: np.empty(capacity, dtype=np.int32 if isinstance(kind, Dictionary) else kind)
+            for name, kind in schema.items()
+        }
+
+    def __len__(self):
+        return self.size
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        capacity = len(next(iter(self._columns.values())))
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self._columns[name] = grown
+
+    def append(self, **columns):
+        # Append one batch of rows; scalar values are broadcast to the batch length
+        length = max((np.size(v) for v in columns.values() if not np.isscalar(v)), default=1)
+        self._reserve(length)
+        end = self.size + length
+        for name, kind in self.schema.items():
+            value = columns[name]
+            if isinstance(kind, Dictionary):
+                values = [value] * length if np.isscalar(value) else value
+                self._columns[name][self.size:end] = kind.encode(values)
+            else:
+                self._columns[name][self.size:end] = value
+        self.size = end
+
+    def clear(self):
+        self.size = 0
+
+    def to_frame(self, **constants):
+        # constants (e.g. run_id) become leading columns without being stored per row
+        data = {name: [value] * self.size for name, value in constants.items()}
+        for name, kind in self.schema.items():
+            column = self._columns[name][:self.size]
+            data[name] = kind.decode(column) if isinstance(kind, Dictionary) else column.copy()
+        return pd.DataFrame(data)
+
+
+def new_run_buffers():
+    # One ticker and one date dictionary shared by all record types of a run
+    tickers = Dictionary()
+    dates = Dictionary()
+    return {
+        "portfolio_composition": ColumnarBuffer({
+            "date": dates,
+            "ticker": tickers,
+            "weight": np.float64,
+            "shares": np.float64,
+            "start_price": np.float64,
+            "end_price": np.float64,
+            "value": np.float64,
+            "return_pct": np.float64,
+        }),
+        "top_companies": ColumnarBuffer({
+            "date": dates,
+            "ticker": tickers,
+            "composite_rank": np.float64,
+            "roce": np.float64,
+            "roe": np.float64,
+            "market_cap": np.float64,
+        }),
+        "top_movers": ColumnarBuffer({
+            "date": dates,
+            "top_winner": tickers,
+            "top_winner_return": np.float64,
+            "top_loser": tickers,
+            "top_loser_return": np.float64,
+        }, capacity=64),
+    }
+
+
+def movers_payload(top_movers_df):
+    # Nested shape returned by /run-backtest
+    return [
+        {
+            "date": date,
+            "top_winner": {"ticker": winner, "return": winner_return},
+            "top_loser": {"ticker": loser, "return": loser_return},
+        }
+        for date, winner, winner_return, loser, loser_return in zip(
+            top_movers_df["date"].astype(str),
+            top_movers_df["top_winner"].astype(str),
+            top_movers_df["top_winner_return"].tolist(),
+            top_movers_df["top_loser"].astype(str),
+            top_movers_df["top_loser_return"].tolist(),
+        )
+    ]
@@ -0,0 +1,203 @@
+import os
+import zipfile
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from sqlalchemy import (
+    JSON, BigInteger, Boolean, Column, DateTime, Float, Index, MetaData, String, Table, delete, func, select, update,
+)
+
+
+# ------------------ Run Registry ------------------
+# One row per backtest with its config, headline metrics and artifact paths,
+# so runs can be listed and compared without opening any export files.
+
+registry_metadata = MetaData()
+
+backtest_runs = Table(
+    "backtest_runs",
+    registry_metadata,
+    Column("run_id", String, primary_key=True),
+    Column("created_at", DateTime, nullable=False),
+    Column("status", String, nullable=False),
+    Column("start_date", String),
+    Column("end_date", String),
+    Column("rebalance_frequency", String),
+    Column("position_sizing", String),
+    Column("ranking", String),
+    Column("cagr", Float),
+    Column("sharpe", Float),
+    Column("max_drawdown", Float),
+    Column("config", JSON),
+    Column("metrics", JSON),
+    Column("artifacts", JSON),
+    Column("size_bytes", BigInteger, default=0),
+    Column("archived", Boolean, default=False),
+    Column("error", String),
+    # One index per /runs filter and sort column
+    Index("idx_backtest_runs_created_at", "created_at"),
+    Index("idx_backtest_runs_cagr", "cagr"),
+    Index("idx_backtest_runs_sharpe", "sharpe"),
+    Index("idx_backtest_runs_max_drawdown", "max_drawdown"),
+    Index("idx_backtest_runs_size_bytes", "size_bytes"),
+    Index("idx_backtest_runs_status", "status"),
+    Index("idx_backtest_runs_rebalance_frequency", "rebalance_frequency"),
+    Index("idx_backtest_runs_position_sizing", "position_sizing"),
+)
+
+SORTABLE = {
+    "created_at": backtest_runs.c.created_at,
+    "cagr": backtest_runs.c.cagr,
+    "sharpe": backtest_runs.c.sharpe,
+    "max_drawdown": backtest_runs.c.max_drawdown,
+    "size_bytes": backtest_runs.c.size_bytes,
+}
+
+SUMMARY_COLUMNS = [
+    backtest_runs.c.run_id,
+    backtest_runs.c.created_at,
+    backtest_runs.c.status,
+    backtest_runs.c.start_date,
+    backtest_runs.c.end_date,
+    backtest_runs.c.rebalance_frequency,
+    backtest_runs.c.position_sizing,
+    backtest_runs.c.ranking,
+    backtest_runs.c.cagr,
+    backtest_runs.c.sharpe,
+    backtest_runs.c.max_drawdown,
+    backtest_runs.c.size_bytes,
+    backtest_runs.c.archived,
+]
+
+
+def create_registry(engine):
+    # The table is created with all its indexes; an existing table only gets
+    # the indexes it is missing
+    registry_metadata.create_all(engine, checkfirst=True)
+    for index in backtest_runs.indexes:
+        index.create(engine, checkfirst=True)
+
+
+def artifact_size(artifacts):
+    return sum(os.path.getsize(path) for path in artifacts.values() if os.path.exists(path))
+
+
+def register_run(conn, run_id, config, metrics=None, artifacts=None, status="completed", error=None):
+    metrics = metrics or {}
+    artifacts = artifacts or {}
+    conn.execute(backtest_runs.insert().values(
+        run_id=run_id,
+        created_at=datetime.now(),
+        status=status,
+        start_date=config.start_date,
+        end_date=config.end_date,
+        rebalance_frequency=config.rebalance_frequency,
+        position_sizing=config.position_sizing,
+        ranking=config.ranking,
+        cagr=metrics.get("cagr"),
+        sharpe=metrics.get("sharpe"),
+        max_drawdown=metrics.get("max_drawdown"),
+        config=config.model_dump(),
+        metrics={k: float(v) for k, v in metrics.items()},
+        artifacts=artifacts,
+        size_bytes=artifact_size(artifacts),
+        archived=False,
+        error=error,
+    ))
+
+
+def list_runs(conn, limit=50, offset=0, sort="created_at", descending=True, status=None,
+              rebalance_frequency=None, position_sizing=None):
+    filters = [
+        column == value
+        for column, value in [
+            (backtest_runs.c.status, status),
+            (backtest_runs.c.rebalance_frequency, rebalance_frequency),
+            (backtest_runs.c.position_sizing, position_sizing),
+        ]
+        if value is not None
+    ]
+    order = SORTABLE[sort].desc() if descending else SORTABLE[sort].asc()
+    stmt = select(*SUMMARY_COLUMNS).where(*filters).order_by(order, backtest_runs.c.run_id).limit(limit).offset(offset)
+    total = conn.execute(select(func.count()).select_from(backtest_runs).where(*filters)).scalar()
+    return total, [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+def get_run(conn, run_id):
+    row = conn.execute(select(backtest_runs).where(backtest_runs.c.run_id == run_id)).first()
+    return dict(row._mapping) if row else None
+
+
+def read_artifact_csv(run, name):
+    # Reads one export of a registered run, whether loose or compacted
+    artifacts = run["artifacts"] or {}
+    if name in artifacts:
+        return pd.read_csv(artifacts[name])
+    if "archive" in artifacts:
+        with zipfile.ZipFile(artifacts["archive"]) as zipf:
+            with zipf.open(f"{run['run_id']}_{name}.csv") as f:
+                return pd.read_csv(f)
+    raise FileNotFoundError(f"Run {run['run_id']} has no {name} export")
+
+
+def _remove_files(artifacts):
+    for path in artifacts.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def delete_run(conn, run_id):
+    run = get_run(conn, run_id)
+    if run is None:
+        return False
+    _remove_files(run["artifacts"] or {})
+    conn.execute(delete(backtest_runs).where(backtest_runs.c.run_id == run_id))
+    return True
+
+
+def compact_run(conn, run, folder):
+    # Replace the loose CSVs of a run by a single deflated archive
+    artifacts = {name: path for name, path in (run["artifacts"] or {}).items() if os.path.exists(path)}
+    if run["archived"] or not artifacts:
+        return
+    archive = os.path.join(folder, f"{run['run_id']}_backtest_export.zip")
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for path in artifacts.values():
+            zipf.write(path, arcname=os.path.basename(path))
+    _remove_files(artifacts)
+    conn.execute(update(backtest_runs).where(backtest_runs.c.run_id == run["run_id"]).values(
+        artifacts={"archive": archive},
+        size_bytes=os.path.getsize(archive),
+        archived=True,
+    ))
+
+
+def apply_retention(conn, folder, max_age_days=0, max_runs=0, compact_after_days=0):
+    # 0 disables a policy. Returns how many runs were deleted and compacted.
+    now = datetime.now()
+    expired = []
+    if max_age_days:
+        expired += conn.execute(
+            select(backtest_runs.c.run_id).where(backtest_runs.c.created_at < now - timedelta(days=max_age_days))
+        ).scalars().all()
+    if max_runs:
+        expired += conn.execute(
+            select(backtest_runs.c.run_id).order_by(backtest_runs.c.created_at.desc()).offset(max_runs)
+        ).scalars().all()
+    expired = set(expired)
+    for run_id in expired:
+        delete_run(conn, run_id)
+
+    compacted = 0
+    if compact_after_days:
+        stale = conn.execute(
+            select(backtest_runs)
+            .where(backtest_runs.c.created_at < now - timedelta(days=compact_after_days))
+            .where(backtest_runs.c.archived.is_(False))
+        ).all()
+        for row in stale:
+            compact_run(conn, dict(row._mapping), folder)
+            compacted += 1
+
+    return {"deleted": len(expired), "compacted": compacted}
@@ -0,0 +1,196 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------ Robustness Analysis ------------------
+# Resamples the per-period returns of a finished run. Simulations are split into
+# fixed-size chunks, each with its own child seed, so results depend only on the
+# seed and not on how many worker processes ran them.
+
+CHUNK_SIZE = 250
+PERCENTILES = [5, 25, 50, 75, 95]
+MAX_WORKERS = os.cpu_count() or 1
+
+# One process pool for the whole server, started on first use. Workers come from
+# forkserver (spawn where that is missing) so they never inherit the server's
+# threads, locks or open connections the way forked children would.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def load_run_returns(composition_df):
+    # (periods x tickers) matrices of weights and simple returns; absent names have weight 0
+    weights = composition_df.pivot_table(index="date", columns="ticker", values="weight", aggfunc="sum", fill_value=0.0)
+    returns = composition_df.pivot_table(index="date", columns="ticker", values="return_pct", aggfunc="mean", fill_value=0.0)
+    returns = returns.reindex(index=weights.index, columns=weights.columns) / 100
+    return weights.to_numpy(dtype=float), returns.to_numpy(dtype=float)
+
+
+def batch_metrics(returns, periods_per_year, lengths=None):
+    # CAGR, Sharpe and max drawdown for every row of a (simulations x periods) array.
+    # Rows shorter than the array are padded with zero returns and described by lengths.
+    sims, periods = returns.shape
+    if lengths is None:
+        lengths = np.full(sims, periods)
+    valid = np.arange(periods)[None, :] < lengths[:, None]
+    returns = np.where(valid, returns, 0.0)
+
+    growth = np.cumprod(1 + returns, axis=1)
+    years = lengths / periods_per_year
+    cagr = growth[:, -1] ** (1 / years) - 1
+
+    mean = returns.sum(axis=1) / lengths
+    var = (np.where(valid, returns - mean[:, None], 0.0) ** 2).sum(axis=1) / np.maximum(lengths - 1, 1)
+    std = np.sqrt(var)
+    sharpe = np.where(std > 0, mean / np.where(std > 0, std, 1) * np.sqrt(periods_per_year), 0.0)
+
+    drawdown = growth / np.maximum.accumulate(np.maximum(growth, 1.0), axis=1) - 1
+    max_drawdown = drawdown.min(axis=1)
+
+    return cagr, sharpe, max_drawdown
+
+
+def _block_bootstrap(rng, weights, returns, sims, params):
+    portfolio = (weights * returns).sum(axis=1)
+    periods = len(portfolio)
+    block = max(1, min(params["block_size"], periods))
+    blocks = -(-periods // block)
+    # Circular blocks: each sampled start is followed by block - 1 consecutive periods
+    starts = rng.integers(0, periods, size=(sims, blocks))
+    index = (starts[:, :, None] + np.arange(block)[None, None, :]).reshape(sims, -1)[:, :periods] % periods
+    return portfolio[index], None
+
+
+def _random_start(rng, weights, returns, sims, params):
+    portfolio = (weights * returns).sum(axis=1)
+    periods = len(portfolio)
+    min_periods = max(2, min(params["min_periods"], periods))
+    starts = rng.integers(0, periods - min_periods + 1, size=sims)
+    lengths = rng.integers(min_periods, periods - starts + 1)
+    index = np.minimum(starts[:, None] + np.arange(periods)[None, :], periods - 1)
+    return portfolio[index], lengths
+
+
+def _universe_subset(rng, weights, returns, sims, params):
+    # Drop each held name independently and re-weight the survivors of every period.
+    # Only the held (period, ticker) cells are sampled, so memory grows with
+    # sims x holdings rather than sims x periods x every ticker of the run.
+    periods = len(weights)
+    rows, columns = np.nonzero(weights)
+    if len(rows) == 0:
+        return np.zeros((sims, periods)), None
+    held_weights = weights[rows, columns]
+    held_returns = returns[rows, columns]
+    kept_weights = held_weights * (rng.random((sims, len(rows))) < params["subset_fraction"])
+
+    # Holdings are grouped by period (np.nonzero is row-major): sum each group
+    held_periods, starts = np.unique(rows, return_index=True)
+    totals = np.zeros((sims, periods))
+    portfolio = np.zeros((sims, periods))
+    totals[:, held_periods] = np.add.reduceat(kept_weights, starts, axis=1)
+    portfolio[:, held_periods] = np.add.reduceat(kept_weights * held_returns, starts, axis=1)
+    return np.where(totals > 0, portfolio / np.where(totals > 0, totals, 1), 0.0), None
+
+
+METHODS = {
+    "block_bootstrap": _block_bootstrap,
+    "random_start": _random_start,
+    "universe_subset": _universe_subset,
+}
+
+
+def run_chunk(method, seed, sims, weights, returns, periods_per_year, params):
+    rng = np.random.default_rng(seed)
+    simulated, lengths = METHODS[method](rng, weights, returns, sims, params)
+    return batch_metrics(simulated, periods_per_year, lengths)
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+        return _pool
+
+
+def reset_pool():
+    # A worker that died takes the pool with it; the next request starts a new one
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def run_parallel(args, workers):
+    # At most `workers` chunks of this request in flight on the shared pool, results in chunk order
+    pool = get_pool()
+    results = [None] * len(args)
+    pending = {}
+    queued = iter(enumerate(args))
+    try:
+        while True:
+            for index, a in queued:
+                pending[pool.submit(run_chunk, *a)] = index
+                if len(pending) >= workers:
+                    break
+            if not pending:
+                return results
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+    except BrokenProcessPool:
+        reset_pool()
+        raise
+
+
+def summarize(values, scale=1.0, digits=2):
+    values = values[np.isfinite(values)] * scale
+    if len(values) == 0:
+        return {}
+    summary = {f"p{p}": round(float(v), digits) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    summary["mean"] = round(float(values.mean()), digits)
+    summary["std"] = round(float(values.std()), digits)
+    return summary
+
+
+def run_robustness(composition_df, periods_per_year, method, simulations, seed, params, workers=None):
+    # periods_per_year: observed from the run's rebalance dates
+    weights, returns = load_run_returns(composition_df)
+    if len(weights) < 2:
+        raise ValueError("Robustness analysis needs at least two rebalance periods.")
+
+    chunks = [min(CHUNK_SIZE, simulations - start) for start in range(0, simulations, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    args = [(method, child, size, weights, returns, periods_per_year, params) for child, size in zip(seeds, chunks)]
+
+    # Never more workers than the machine has cores, whatever the request asks for
+    workers = max(1, min(workers or MAX_WORKERS, MAX_WORKERS, len(chunks)))
+    if workers == 1:
+        results = [run_chunk(*a) for a in args]
+    else:
+        results = run_parallel(args, workers)
+
+    cagr, sharpe, max_drawdown = (np.concatenate(part) for part in zip(*results))
+    return {
+        "method": method,
+        "simulations": simulations,
+        "seed": seed,
+        "periods": len(weights),
+        "cagr": summarize(cagr, 100),
+        "sharpe": summarize(sharpe),
+        "max_drawdown": summarize(max_drawdown, 100),
+        "prob_loss": round(float((cagr < 0).mean()), 4),
+    }
+
+
+def load_composition(run_id, folder="data/exports"):
+    return pd.read_csv(f"{folder}/{run_id}_portfolio_composition.csv")
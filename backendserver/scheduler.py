@@ -0,0 +1,87 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import CustomBusinessDay
+
+
+# ------------------ Rebalance Scheduler ------------------
+# Rebalance dates are generated on the exchange trading calendar: weekends and
+# the holidays listed in HOLIDAY_FILE are never used as trade dates.
+
+HOLIDAY_FILE = "data/nse_holidays.csv"
+
+FREQUENCIES = {
+    "weekly": pd.DateOffset(weeks=1),
+    "monthly": pd.DateOffset(months=1),
+    "quarterly": pd.DateOffset(months=3),
+    "yearly": pd.DateOffset(years=1),
+}
+
+
+@lru_cache(maxsize=4)
+def load_holidays(path=HOLIDAY_FILE):
+    try:
+        holidays = pd.read_csv(path, parse_dates=["date"])["date"]
+    except FileNotFoundError:
+        print(f"Holiday file {path} not found, using weekdays only")
+        return pd.DatetimeIndex([])
+    return pd.DatetimeIndex(holidays).normalize().sort_values()
+
+
+def trading_days(start, end, holidays=None):
+    holidays = load_holidays() if holidays is None else holidays
+    return pd.date_range(start, end, freq=CustomBusinessDay(holidays=list(holidays)))
+
+
+def snap(dates, calendar, forward=True):
+    # Move each date to the nearest trading day on or after it (or on or before it)
+    dates = pd.DatetimeIndex(dates)
+    if forward:
+        rows = calendar.searchsorted(dates, side="left")
+        rows = rows[rows < len(calendar)]
+    else:
+        rows = calendar.searchsorted(dates, side="right") - 1
+        rows = rows[rows >= 0]
+    return calendar[rows]
+
+
+def candidate_dates(config, start, end):
+    # Raw calendar dates for each frequency, before snapping to trading days
+    frequency = config.rebalance_frequency
+    if frequency == "month_end":
+        return pd.date_range(start, end, freq="ME")
+    if frequency == "day_of_month":
+        months = pd.date_range(start.replace(day=1), end, freq="MS")
+        # Days past a month's end (29-31) fall on its last day
+        days = np.minimum(max(config.rebalance_day or 1, 1), months.days_in_month)
+        return months + pd.to_timedelta(days - 1, unit="D")
+    if frequency == "signal":
+        return pd.DatetimeIndex(pd.to_datetime(config.signal_dates or []))
+    return pd.date_range(start, end, freq=FREQUENCIES.get(frequency, FREQUENCIES["monthly"]))
+
+
+def build_schedule(config, start=None, end=None, holidays=None):
+    start = pd.to_datetime(start or config.start_date)
+    end = pd.to_datetime(end or config.end_date)
+    calendar = trading_days(start, end, holidays)
+    if calendar.empty:
+        raise ValueError(f"No trading days between {start.date()} and {end.date()}")
+
+    dates = candidate_dates(config, start, end)
+    dates = dates[(dates >= start) & (dates < end)]
+    # Month ends roll back to the last trading day of the month, everything else rolls forward.
+    # The run always starts on the first trading day and ends on the last one.
+    dates = snap(dates, calendar, forward=config.rebalance_frequency != "month_end")
+    dates = dates.union(calendar[[0, -1]])
+    return list(dates.unique().sort_values())
+
+
+def map_to_rows(dates, index, run_end=True):
+    # Row of the first price on or after each rebalance date; the final date of the
+    # run maps to the last price on or before it, so the run never reads past its end.
+    # A chunk of a run passes run_end=False: its last date is the next chunk's first.
+    rows = index.searchsorted(pd.DatetimeIndex(dates), side="left")
+    if run_end:
+        rows[-1] = index.searchsorted(pd.Timestamp(dates[-1]), side="right") - 1
+    return np.minimum(rows, len(index) - 1)
@@ -20,5 +20,26 @@ CREATE TABLE fundamentals (
   pat BIGINT,
   pe REAL,
   market_cap BIGINT,
+  published_on DATE,
   UNIQUE (company_id, year)
 );
+
+CREATE TABLE company_listings (
+  id SERIAL PRIMARY KEY,
+  company_id INTEGER NOT NULL REFERENCES companies(id),
+  listed_on DATE NOT NULL,
+  delisted_on DATE
+);
+
+CREATE TABLE index_membership (
+  id SERIAL PRIMARY KEY,
+  company_id INTEGER NOT NULL REFERENCES companies(id),
+  index_name TEXT NOT NULL,
+  start_date DATE NOT NULL,
+  end_date DATE
+);
+
+CREATE INDEX idx_index_membership_name ON index_membership (index_name, start_date);
+
+-- backtest_runs (the run registry) is created by the backend on startup from
+-- registry.py, so re-seeding these tables keeps past runs listed
@@ -1,5 +1,7 @@
 import pandas as pd
 from sqlalchemy import create_engine, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from dotenv import load_dotenv
 import os
 
@@ -10,6 +12,8 @@ engine = create_engine(DB_URL)
 def drop_existing_tables(engine):
     with engine.connect() as conn:
         print("🧹 Dropping existing tables (if any)...")
+        conn.execute(text("DROP TABLE IF EXISTS index_membership;"))
+        conn.execute(text("DROP TABLE IF EXISTS company_listings;"))
         conn.execute(text("DROP TABLE IF EXISTS fundamentals;"))
         conn.execute(text("DROP TABLE IF EXISTS prices;"))
         conn.execute(text("DROP TABLE IF EXISTS companies;"))
@@ -31,27 +35,48 @@ def insert_companies(fundamental_csv, price_csv):
 
 def insert_fundamentals(fundamental_csv):
     print("🧾 Inserting fundamentals from CSV...")
-    df = pd.read_csv(fundamental_csv)
+    insert_fundamentals_df(pd.read_csv(fundamental_csv))
 
+
+def upsert_fundamentals(pd_table, conn, keys, data_iter):
+    # to_sql method: INSERT ... ON CONFLICT (company_id, year) DO UPDATE, so
+    # re-ingesting a year overwrites it instead of violating the unique key
+    rows = [dict(zip(keys, row)) for row in data_iter]
+    dialect_insert = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}[conn.dialect.name]
+    stmt = dialect_insert(pd_table.table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["company_id", "year"],
+        set_={key: stmt.excluded[key] for key in keys if key not in ("company_id", "year")},
+    )
+    return conn.execute(stmt).rowcount
+
+
+def insert_fundamentals_df(df, chunksize=1000):
+    # Bulk upsert of a fundamentals frame in the CSV layout (companyticker, marketcap, ...)
     # Rename CSV columns to match database schema
-    df.rename(columns={
+    df = df.rename(columns={
         "companyticker": "ticker",
         "marketcap": "market_cap"
-    }, inplace=True)
+    })
 
     # Get company_id mapping
     companies = pd.read_sql("SELECT id, ticker FROM companies", con=engine)
     print(len(companies))
+    unknown = sorted(set(df["ticker"]) - set(companies["ticker"]))
+    if unknown:
+        print(f"⚠️ Skipping {len(unknown)} tickers not in companies: {unknown[:10]}")
     df = df.merge(companies, on="ticker")
     df.drop(columns=["ticker"], inplace=True)
     df.rename(columns={"id": "company_id"}, inplace=True)
+    # One row per key, or the upsert would touch the same row twice in a statement
+    df = df.drop_duplicates(subset=["company_id", "year"], keep="last")
     print("Number of rows:", df.shape[0])
     print(df.columns)
 
-
-    # Insert into fundamentals table
-    df.to_sql("fundamentals", con=engine, if_exists="append", index=False)
-    print("✅ Fundamentals inserted.")
+    # Multi-row upserts, one statement per chunk, all in one transaction
+    with engine.begin() as conn:
+        df.to_sql("fundamentals", con=conn, if_exists="append", index=False, method=upsert_fundamentals, chunksize=chunksize)
+    print("✅ Fundamentals upserted.")
 
 
 def insert_prices(csv_path):
@@ -67,6 +92,23 @@ def insert_prices(csv_path):
     df.to_sql("prices", con=engine, if_exists="append", index=False)
     print("✅ Prices inserted.")
 
+def insert_universe(listings_csv, membership_csv):
+    # Optional point-in-time universe: listing/delisting dates and index membership intervals
+    companies = pd.read_sql("SELECT id, ticker FROM companies", con=engine)
+    for csv_path, table, date_columns in [
+        (listings_csv, "company_listings", ["listed_on", "delisted_on"]),
+        (membership_csv, "index_membership", ["start_date", "end_date"]),
+    ]:
+        if not os.path.exists(csv_path):
+            print(f"⏭️ {csv_path} not found, skipping {table}.")
+            continue
+        df = pd.read_csv(csv_path, parse_dates=date_columns)
+        df = df.merge(companies, on="ticker")
+        df.drop(columns=["ticker"], inplace=True)
+        df.rename(columns={"id": "company_id"}, inplace=True)
+        df.to_sql(table, con=engine, if_exists="append", index=False)
+        print(f"✅ {len(df)} rows inserted into {table}.")
+
 def print_table_schema(table_name):
     with engine.connect() as conn:
         result = conn.execute(text(f"""
@@ -86,7 +128,8 @@ if __name__ == "__main__":
     insert_companies("./data/New-fundamental_data.csv", "./data/prices.csv")
     insert_fundamentals("./data/New-fundamental_data.csv")
     insert_prices("./data/prices.csv")
-    for table in ["companies", "fundamentals", "prices"]:
+    insert_universe("./data/company_listings.csv", "./data/index_membership.csv")
+    for table in ["companies", "fundamentals", "prices", "company_listings", "index_membership"]:
         print_table_schema(table)
 
 
@@ -0,0 +1,140 @@
+import numpy as np
+
+
+# ------------------ Position Sizing ------------------
+# Every function here works on (periods x names) matrices so a whole run can be
+# sized in one call. Names that are not held in a period are masked out.
+
+
+def normalize_rows(raw, mask):
+    # Turn non-negative scores into weights; rows with no usable score fall back to equal weight
+    raw = np.where(mask & np.isfinite(raw), np.clip(raw, 0, None), 0.0)
+    totals = raw.sum(axis=1, keepdims=True)
+    counts = mask.sum(axis=1, keepdims=True)
+    equal = np.where(mask, 1.0 / np.maximum(counts, 1), 0.0)
+    return np.where(totals > 0, raw / np.where(totals > 0, totals, 1), equal)
+
+
+def project_weights(weights, mask, min_weight=0.0, max_weight=1.0, iterations=100, tol=1e-10):
+    # Iteratively clip to [min_weight, max_weight] and hand the excess (or shortfall)
+    # to the names that are still free to move, until each row sums to 1
+    counts = np.maximum(mask.sum(axis=1, keepdims=True), 1)
+    # Relax bounds that cannot be met with the number of names held
+    lo = np.minimum(min_weight, 1.0 / counts)
+    hi = np.maximum(max_weight, 1.0 / counts)
+
+    w = np.where(mask, weights, 0.0)
+    for _ in range(iterations):
+        w = np.where(mask, np.clip(w, lo, hi), 0.0)
+        gap = 1.0 - w.sum(axis=1, keepdims=True)
+        if np.all(np.abs(gap) < tol):
+            break
+
+        free = mask & np.where(gap > 0, w < hi, w > lo)
+        share = np.where(free, w, 0.0)
+        share_total = share.sum(axis=1, keepdims=True)
+        free_count = free.sum(axis=1, keepdims=True)
+        # Spread in proportion to current weight, or evenly if the free names hold nothing
+        share = np.where(
+            share_total > 0,
+            share / np.where(share_total > 0, share_total, 1),
+            np.where(free, 1.0 / np.maximum(free_count, 1), 0.0),
+        )
+        w = w + gap * share
+
+    return w
+
+
+def trailing_volatility(returns):
+    # Per-name standard deviation of trailing daily returns
+    return returns.std().to_numpy(dtype=float)
+
+
+def inverse_volatility(vols, mask):
+    # Names without a usable history get the average inverse volatility of the row
+    inv = np.where(mask & (vols > 0), 1.0 / np.where(vols > 0, vols, 1), np.nan)
+    row_mean = np.nanmean(np.where(np.isnan(inv).all(axis=1, keepdims=True), 1.0, inv), axis=1, keepdims=True)
+    inv = np.where(np.isnan(inv), row_mean, inv)
+    return normalize_rows(inv, mask)
+
+
+def risk_parity(covariances, mask, iterations=1000, tol=1e-9):
+    # Equal risk contribution by cyclical coordinate descent on
+    #   min 0.5 * x'Cx - sum(log x_i)
+    # whose minimiser has x_i * (Cx)_i = 1 for every name. Each coordinate update
+    # is the positive root of a quadratic, so no held name can reach zero weight.
+    # Solved for a stack of (periods x names x names) covariance matrices.
+    names = covariances.shape[-1]
+    covariances = np.where(np.isfinite(covariances), covariances, 0.0)
+    # Masked names get an isolated unit variance so they do not affect the others
+    eye = np.eye(names, dtype=bool)
+    pair_mask = mask[:, :, None] & mask[:, None, :]
+    covariances = np.where(pair_mask, covariances, np.where(eye, 1.0, 0.0))
+
+    # Names without a usable variance are treated as an average, uncorrelated name
+    diag = np.diagonal(covariances, axis1=1, axis2=2)
+    usable = diag > 0
+    typical = np.where(usable, diag, 0.0).sum(axis=1) / np.maximum(usable.sum(axis=1), 1)
+    typical = np.where(typical > 0, typical, 1.0)[:, None]
+    unusable = ~usable
+    covariances = np.where(
+        unusable[:, :, None] | unusable[:, None, :],
+        np.where(eye, np.broadcast_to(typical, diag.shape)[:, :, None], 0.0),
+        covariances,
+    )
+    diag = np.diagonal(covariances, axis1=1, axis2=2).copy()
+
+    x = 1.0 / np.sqrt(diag)
+    for _ in range(iterations):
+        for i in range(names):
+            others = np.einsum("pj,pj->p", covariances[:, i, :], x) - diag[:, i] * x[:, i]
+            x[:, i] = (np.sqrt(others ** 2 + 4 * diag[:, i]) - others) / (2 * diag[:, i])
+        contributions = x * np.einsum("pij,pj->pi", covariances, x)
+        if np.max(np.abs(contributions - 1.0), initial=0.0, where=mask) < tol:
+            break
+    else:
+        print(f"risk_parity: contributions still differ by {np.max(np.abs(contributions - 1.0), initial=0.0, where=mask):.2e}")
+
+    return normalize_rows(x, mask)
+
+
+def risk_contributions(covariances, weights):
+    # w_i * (Cov w)_i per name; equal across held names for a risk parity portfolio
+    return weights * np.einsum("pij,pj->pi", covariances, weights)
+
+
+def size_periods(tickers_by_period, config, scores_by_period=None, trailing_by_period=None):
+    # Weights for a stack of periods, one {ticker: weight} dict per period. Names
+    # of a period fill its row from the left; the rest of the row is masked out.
+    periods = len(tickers_by_period)
+    slots = max([len(tickers) for tickers in tickers_by_period] + [1])
+    mask = np.zeros((periods, slots), dtype=bool)
+    for p, tickers in enumerate(tickers_by_period):
+        mask[p, :len(tickers)] = True
+
+    if config.position_sizing in ("inverse_vol", "risk_parity") and trailing_by_period is not None:
+        returns = [
+            trailing_prices.reindex(columns=tickers).pct_change(fill_method=None).iloc[1:]
+            for tickers, trailing_prices in zip(tickers_by_period, trailing_by_period)
+        ]
+        if config.position_sizing == "inverse_vol":
+            vols = np.full((periods, slots), np.nan)
+            for p, period_returns in enumerate(returns):
+                vols[p, :period_returns.shape[1]] = trailing_volatility(period_returns)
+            raw = inverse_volatility(vols, mask)
+        else:
+            cov = np.full((periods, slots, slots), np.nan)
+            for p, period_returns in enumerate(returns):
+                n = period_returns.shape[1]
+                cov[p, :n, :n] = period_returns.cov().to_numpy(dtype=float)
+            raw = risk_parity(cov, mask)
+    elif scores_by_period is not None:
+        scores = np.full((periods, slots), np.nan)
+        for p, period_scores in enumerate(scores_by_period):
+            scores[p, :len(period_scores)] = period_scores
+        raw = normalize_rows(scores, mask)
+    else:
+        raw = normalize_rows(np.ones((periods, slots)), mask)
+
+    weights = project_weights(raw, mask, config.min_weight, config.max_weight)
+    return [dict(zip(tickers, weights[p, :len(tickers)])) for p, tickers in enumerate(tickers_by_period)]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, BigInteger, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, BigInteger, Date, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -12,6 +12,8 @@ class Company(Base):
 
     fundamentals = relationship("Fundamental", back_populates="company", cascade="all, delete-orphan")
     prices = relationship("Price", back_populates="company", cascade="all, delete-orphan")
+    listings = relationship("CompanyListing", back_populates="company", cascade="all, delete-orphan")
+    index_memberships = relationship("IndexMembership", back_populates="company", cascade="all, delete-orphan")
 
 class Fundamental(Base):
     __tablename__ = "fundamentals"
@@ -23,6 +25,7 @@ class Fundamental(Base):
     pat = Column(BigInteger)
     pe = Column(Float)
     market_cap = Column(BigInteger)
+    published_on = Column(Date)
 
     company = relationship("Company", back_populates="fundamentals")
     __table_args__ = (UniqueConstraint('company_id', 'year', name='_fundamentals_uc'),)
@@ -36,3 +39,23 @@ class Price(Base):
 
     company = relationship("Company", back_populates="prices")
     __table_args__ = (UniqueConstraint('company_id', 'year', name='_prices_uc'),)
+
+class CompanyListing(Base):
+    __tablename__ = "company_listings"
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    listed_on = Column(Date, nullable=False)
+    delisted_on = Column(Date)
+
+    company = relationship("Company", back_populates="listings")
+
+class IndexMembership(Base):
+    __tablename__ = "index_membership"
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    index_name = Column(String, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date)
+
+    company = relationship("Company", back_populates="index_memberships")
+    __table_args__ = (Index('idx_index_membership_name', 'index_name', 'start_date'),)
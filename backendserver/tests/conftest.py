@@ -0,0 +1,33 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# The backend modules are flat files next to main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    # main.py connects on import: point it at a seeded SQLite stand-in (aiosqlite for
+    # the async engine) in a scratch directory, like the load test does
+    import loadtest
+
+    cwd = os.getcwd()
+    workdir, tickers = loadtest.prepare_workdir(rate_limit="1000000/minute", worker_threads=0)
+    import main
+    from providers import MemoryProvider, ProviderChain
+
+    main.market_data = ProviderChain([MemoryProvider(loadtest.synthetic_bars(tickers + ["^NSEI"]))])
+    yield main
+    os.chdir(cwd)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client(app_module):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app_module.app) as test_client:
+        yield test_client
@@ -0,0 +1,46 @@
+import pandas as pd
+
+from asof import asof_snapshots, available_dates, last_estimated_year
+
+
+def history(published_on):
+    # Company 1 publishes FY2022 (year end 31 March 2022) early; company 2 has no date
+    return pd.DataFrame({
+        "company_id": [1, 1, 2, 2],
+        "year": [2021, 2022, 2021, 2022],
+        "roe": [10.0, 12.0, 20.0, 22.0],
+        "published_on": published_on,
+    })
+
+
+def test_published_on_wins_over_the_lag_estimate():
+    df = history(["2021-05-10", "2022-04-20", None, None])
+    dates = available_dates(df, 60)
+    assert list(dates.dt.strftime("%Y-%m-%d")) == ["2021-05-10", "2022-04-20", "2021-05-30", "2022-05-30"]
+
+
+def test_snapshots_pick_the_latest_available_row_per_company():
+    df = history(["2021-05-10", "2022-04-20", None, None])
+    snapshots = asof_snapshots(df, pd.DatetimeIndex(["2022-04-19", "2022-04-20", "2022-05-29", "2022-05-30"]), 60)
+    years = snapshots.pivot(index="rebalance_date", columns="company_id", values="year")
+    # Company 1 switches on its publication date, company 2 on 31 March + 60 days
+    assert years[1].tolist() == [2021, 2022, 2022, 2022]
+    assert years[2].tolist() == [2021, 2021, 2021, 2022]
+
+
+def test_without_a_published_on_column_every_row_uses_the_lag():
+    df = history([None] * 4).drop(columns="published_on")
+    snapshots = asof_snapshots(df, pd.DatetimeIndex(["2022-05-15"]), 30)
+    # 31 March + 30 days = 30 April, so FY2022 is already visible for both
+    assert snapshots.set_index("company_id")["year"].to_dict() == {1: 2022, 2: 2022}
+
+
+def test_nothing_published_yet_gives_no_rows():
+    df = history([None] * 4)
+    assert asof_snapshots(df, pd.DatetimeIndex(["2021-05-01"]), 60).empty
+
+
+def test_last_estimated_year():
+    assert last_estimated_year(pd.Timestamp("2022-05-29"), 60) == 2021
+    assert last_estimated_year(pd.Timestamp("2022-05-30"), 60) == 2022
+    assert last_estimated_year(pd.Timestamp("2023-02-01"), 400) == 2021
@@ -0,0 +1,61 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from barstore import BarStore
+
+
+def bars(start, periods, level):
+    index = pd.bdate_range(start, periods=periods)
+    values = np.full(periods, level, dtype=float)
+    return pd.DataFrame({"Open": values, "High": values, "Low": values, "Close": values, "Volume": values}, index=index)
+
+
+def test_round_trip_is_float32(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.write("AAA.NS", bars("2022-01-03", 20, 101.3), "2022-01-01", "2022-02-01")
+    frame = store.read("AAA.NS", "2022-01-01", "2022-02-01")
+    assert len(frame) == 20
+    assert frame.dtypes.eq(np.float32).all()
+    assert store.read("AAA.NS", "2021-12-01", "2022-02-01") is None
+
+
+def test_concurrent_writers_leave_no_temp_files(tmp_path):
+    store = BarStore(str(tmp_path))
+
+    def write(level):
+        store.write("AAA.NS", bars("2022-01-03", 20, level), "2022-01-01", "2022-02-01")
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(write, range(1, 65)))
+
+    assert sorted(os.listdir(tmp_path)) == ["AAA.NS.bars.npy"]
+    frame = store.read("AAA.NS", "2022-01-01", "2022-02-01")
+    assert frame is not None and len(frame) == 20
+
+
+def test_concurrent_writers_on_different_windows_keep_bars_with_their_dates(tmp_path):
+    store = BarStore(str(tmp_path))
+    windows = [("2022-01-01", "2022-02-01", 2022.0), ("2023-01-01", "2023-02-01", 2023.0)]
+
+    def write(i):
+        start, end, level = windows[i % 2]
+        store.write("AAA.NS", bars(start, 20, level), start, end)
+
+    def read(i):
+        start, end, level = windows[i % 2]
+        frame = store.read("AAA.NS", start, end)
+        return frame is None or ((frame["Close"] == level).all() and (frame.index.year == int(level)).all())
+
+    with ThreadPoolExecutor(8) as pool:
+        writes = pool.map(write, range(200))
+        reads = list(pool.map(read, range(400)))
+        list(writes)
+
+    assert all(reads)
+    for start, end, level in windows:
+        frame = store.read("AAA.NS", start, end)
+        if frame is not None:
+            assert (frame["Close"] == level).all() and (frame.index.year == int(level)).all()
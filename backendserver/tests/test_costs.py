@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from costs import apply_min_trade, drifted_weights, rebalance_costs, weight_changes
+
+
+def cost_config(commission_bps=0.0, slippage_bps=0.0, impact_bps=0.0, min_trade_weight=0.0):
+    return SimpleNamespace(commission_bps=commission_bps, slippage_bps=slippage_bps,
+                           impact_bps=impact_bps, min_trade_weight=min_trade_weight)
+
+
+def test_first_rebalance_trades_the_whole_book():
+    target = pd.Series({"A": 0.5, "B": 0.3, "C": 0.2})
+    executed, turnover, cost = rebalance_costs(None, target, 100000, cost_config(commission_bps=10, slippage_bps=5))
+    pd.testing.assert_series_equal(executed, target)
+    assert turnover == pytest.approx(1.0)
+    # 15 bps on the full 100000
+    assert cost == pytest.approx(150.0)
+
+
+def test_turnover_counts_exits_and_entries():
+    prev = pd.Series({"A": 0.5, "B": 0.5})
+    target = pd.Series({"B": 0.4, "C": 0.6})
+    delta = weight_changes(prev, target)
+    assert delta.to_dict() == pytest.approx({"A": 0.5, "B": 0.1, "C": 0.6})
+
+    _, turnover, cost = rebalance_costs(prev, target, 50000, cost_config(commission_bps=20, impact_bps=100))
+    assert turnover == pytest.approx(1.2)
+    # Linear 20 bps on 1.2 of capital plus impact 100 bps x (0.25 + 0.01 + 0.36)
+    assert cost == pytest.approx(50000 * (0.002 * 1.2 + 0.01 * 0.62))
+
+
+def test_cost_is_capped_at_capital():
+    target = pd.Series({"A": 1.0})
+    _, _, cost = rebalance_costs(None, target, 1000, cost_config(commission_bps=20000))
+    assert cost == 1000
+
+
+def test_small_trades_are_skipped_and_the_rest_rescaled():
+    prev = pd.Series({"A": 0.32, "B": 0.38, "C": 0.30})
+    target = pd.Series({"A": 0.30, "B": 0.30, "C": 0.40})
+    executed = apply_min_trade(prev, target, 0.05)
+    # A moves by 0.02 and keeps its drifted 0.32; B and C share the remaining 0.68 pro rata
+    assert executed.to_dict() == pytest.approx({"A": 0.32, "B": 0.30 * 0.68 / 0.70, "C": 0.40 * 0.68 / 0.70})
+    assert executed.sum() == pytest.approx(1.0)
+
+    _, turnover, _ = rebalance_costs(prev, target, 1000, cost_config(min_trade_weight=0.05))
+    assert turnover == pytest.approx(abs(0.30 * 0.68 / 0.70 - 0.38) + abs(0.40 * 0.68 / 0.70 - 0.30))
+
+
+def test_new_names_are_never_skipped():
+    prev = pd.Series({"A": 1.0})
+    target = pd.Series({"A": 0.98, "B": 0.02})
+    executed = apply_min_trade(prev, target, 0.05)
+    # A is within the threshold and held at 1.0, so B's small entry is all that trades
+    assert executed.to_dict() == pytest.approx({"A": 1.0 / 1.02, "B": 0.02 / 1.02})
+
+
+def test_drifted_weights_follow_prices():
+    shares = pd.Series({"A": 10.0, "B": 10.0})
+    weights = drifted_weights(shares, pd.Series({"A": 30.0, "B": 10.0}))
+    assert weights.to_dict() == pytest.approx({"A": 0.75, "B": 0.25})
+    assert drifted_weights(shares, pd.Series({"A": 0.0, "B": 0.0})).sum() == 0
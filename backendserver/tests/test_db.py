@@ -0,0 +1,54 @@
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from db import async_url, pool_settings
+
+
+def test_async_url_swaps_driver_and_keeps_options():
+    url = async_url("postgresql://user:secret@db:5432/backtests?sslmode=require")
+    assert url.drivername == "postgresql+psycopg"
+    assert url.password == "secret"
+    assert url.query == {"sslmode": "require"}
+    assert async_url("sqlite:///data/test.db").drivername == "sqlite+aiosqlite"
+
+
+def test_sqlite_has_no_pool_settings(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    assert pool_settings(make_url("sqlite:///x.db")) == {}
+    assert pool_settings(make_url("postgresql://h/db"))["pool_size"] == 3
+
+
+def test_sync_and_async_engines_read_the_same_history(app_module, client):
+    main = app_module
+    assert main.async_engine.url.drivername == "sqlite+aiosqlite"
+
+    with main.engine.connect() as conn:
+        sync_df = main.read_fundamentals_history(conn, 2022)
+
+    async def read_async():
+        async with main.async_engine.connect() as conn:
+            return await conn.run_sync(main.read_fundamentals_history, 2022)
+
+    # On the app's event loop, where the async engine's pooled connections live
+    async_df = client.portal.call(read_async)
+    assert not sync_df.empty
+    assert sync_df["year"].max() == 2022
+    pd.testing.assert_frame_equal(sync_df, async_df)
+
+
+def test_async_engine_sees_sync_writes(app_module, client):
+    main = app_module
+    with main.engine.begin() as conn:
+        conn.execute(main.companies.insert().values(ticker="TESTWRITE.NS"))
+
+    async def count_async():
+        async with main.async_engine.connect() as conn:
+            result = await conn.execute(select(func.count()).select_from(main.companies).where(main.companies.c.ticker == "TESTWRITE.NS"))
+            return result.scalar()
+
+    try:
+        assert client.portal.call(count_async) == 1
+    finally:
+        with main.engine.begin() as conn:
+            conn.execute(main.companies.delete().where(main.companies.c.ticker == "TESTWRITE.NS"))
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from downsample import downsample_rows, lttb_indices
+
+
+def series(n, seed):
+    return np.cumsum(np.random.default_rng(seed).normal(size=n))
+
+
+def test_lttb_keeps_ends_and_budget():
+    y = series(1000, 0)
+    rows = lttb_indices(y, 50)
+    assert len(rows) == 50
+    assert rows[0] == 0 and rows[-1] == 999
+
+
+@pytest.mark.parametrize("columns,max_points", [(2, 6), (2, 7), (8, 24), (8, 100), (21, 500)])
+def test_downsample_rows_never_exceeds_max_points(columns, max_points):
+    rows = downsample_rows([series(2000, seed) for seed in range(columns)], max_points)
+    assert len(rows) <= max_points
+    assert rows[0] == 0 and rows[-1] == 1999
+
+
+def test_downsample_rows_rejects_budgets_below_three_per_series():
+    with pytest.raises(ValueError):
+        downsample_rows([series(100, seed) for seed in range(4)], 11)
+
+
+def test_short_series_are_returned_whole():
+    assert len(downsample_rows([series(10, 0), series(10, 1)], 10)) == 10
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import factors
+from factors import factor_window, load_factor_values
+from scheduler import trading_days
+
+
+def price_source(first_day="2010-01-01"):
+    calls = []
+
+    def fetch(tickers, start, end):
+        calls.append((start, end))
+        index = trading_days(max(pd.Timestamp(start), pd.Timestamp(first_day)), end)
+        close = pd.DataFrame(100 * 1.001 ** np.arange(len(index))[:, None].repeat(len(tickers), 1), index=index, columns=tickers)
+        return pd.concat({"Close": close, "Volume": close * 0 + 1000}, axis=1)
+
+    return fetch, calls
+
+
+def test_twelve_month_factors_have_a_full_window_after_holidays(monkeypatch):
+    monkeypatch.setattr(factors, "_factor_cache", factors.OrderedDict())
+    fetch, calls = price_source()
+    dates = ["2023-11-13", "2024-01-01", "2024-04-01"]
+    values = load_factor_values(["mom12", "vol12", "dd12"], dates, ["AAA.NS", "BBB.NS"], fetch)
+
+    assert len(calls) == 1
+    for date in dates:
+        assert not values[pd.Timestamp(date)][["mom12", "vol12", "dd12"]].isna().any().any()
+    expected = 1.001 ** factor_window("mom12") - 1
+    assert np.allclose(values[pd.Timestamp("2024-01-01")]["mom12"], expected)
+
+
+def test_short_history_is_not_cached(monkeypatch):
+    monkeypatch.setattr(factors, "_factor_cache", factors.OrderedDict())
+    fetch, calls = price_source(first_day="2023-06-01")
+    values = load_factor_values(["mom12"], ["2024-01-01"], ["AAA.NS"], fetch)
+    assert values[pd.Timestamp("2024-01-01")]["mom12"].isna().all()
+
+    load_factor_values(["mom12"], ["2024-01-01"], ["AAA.NS"], fetch)
+    assert len(calls) == 2
@@ -0,0 +1,54 @@
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+# script.py connects on import
+os.environ.setdefault("DB_URL", "sqlite://")
+import script
+
+
+@pytest.fixture
+def fundamentals_db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ingest.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE companies (id INTEGER PRIMARY KEY, ticker TEXT UNIQUE NOT NULL)"))
+        conn.execute(text("""
+            CREATE TABLE fundamentals (id INTEGER PRIMARY KEY, company_id INTEGER NOT NULL, year INTEGER NOT NULL,
+                roe REAL, roce REAL, pat BIGINT, pe REAL, market_cap BIGINT, published_on DATE,
+                UNIQUE (company_id, year))
+        """))
+        conn.execute(text("INSERT INTO companies (id, ticker) VALUES (1, 'AAA.NS'), (2, 'BBB.NS')"))
+    monkeypatch.setattr(script, "engine", engine)
+    return engine
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=["companyticker", "year", "roce", "roe", "pat", "pe", "marketcap"])
+
+
+def test_reingest_updates_existing_years(fundamentals_db):
+    script.insert_fundamentals_df(frame([
+        ("AAA.NS", 2022, 10.0, 12.0, 100, 20.0, 5000),
+        ("BBB.NS", 2022, 15.0, 18.0, 200, 25.0, 8000),
+    ]))
+    script.insert_fundamentals_df(frame([
+        ("AAA.NS", 2022, 11.0, 13.0, 110, None, 5500),
+        ("AAA.NS", 2023, 12.0, 14.0, 120, 22.0, 6000),
+        ("CCC.NS", 2023, 1.0, 1.0, 1, 1.0, 1),
+    ]))
+
+    rows = pd.read_sql("SELECT company_id, year, roce, pe, market_cap FROM fundamentals ORDER BY company_id, year", fundamentals_db)
+    assert rows[["company_id", "year"]].values.tolist() == [[1, 2022], [1, 2023], [2, 2022]]
+    assert rows["roce"].tolist() == [11.0, 12.0, 15.0]
+    assert pd.isna(rows["pe"].iloc[0])
+    assert rows["market_cap"].iloc[0] == 5500
+
+
+def test_duplicate_keys_in_one_batch_keep_the_last(fundamentals_db):
+    script.insert_fundamentals_df(frame([
+        ("AAA.NS", 2022, 10.0, 12.0, 100, 20.0, 5000),
+        ("AAA.NS", 2022, 30.0, 12.0, 100, 20.0, 5000),
+    ]))
+    assert pd.read_sql("SELECT roce FROM fundamentals", fundamentals_db)["roce"].tolist() == [30.0]
@@ -0,0 +1,34 @@
+import os
+
+import loadtest
+
+CONFIG = {**loadtest.BACKTEST_CONFIG, "start_date": "2021-01-01", "end_date": "2022-06-30"}
+
+
+def test_compute_nifty_serializes_float32_closes(client):
+    # Providers return float32 bars; scalars taken from them must still be JSON numbers
+    response = client.post("/compute-nifty", json=CONFIG)
+    assert response.status_code == 200
+    points = response.json()
+    assert len(points) > 2
+    assert all(isinstance(point["value"], float) and point["value"] > 0 for point in points)
+
+
+def test_backtest_payload_from_float32_bars(client):
+    response = client.post("/run-backtest", json={**CONFIG, "execution_price": "vwap", "vwap_days": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert all(isinstance(point["value"], float) for point in body["equity_curve"])
+    assert body["data_quality"]["ok"] == body["data_quality"]["periods"]
+
+
+def test_unknown_execution_price_is_rejected_before_the_run(app_module, client):
+    before = set(os.listdir(app_module.export_dir))
+    response = client.post("/run-backtest", json={**CONFIG, "execution_price": "midpoint"})
+    assert response.status_code == 422
+    assert set(os.listdir(app_module.export_dir)) == before
+
+
+def test_downloads_leave_no_csv_copies(client):
+    assert client.post("/compute-nifty", json=CONFIG).status_code == 200
+    assert not os.path.exists("data/tmp") or not os.listdir("data/tmp")
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from barstore import BarStore
+from providers import (
+    BarStoreProvider, CircuitBreaker, LocalProvider, MemoryProvider, ProviderChain,
+    ProviderUnavailable, ResilientProvider,
+)
+
+
+def bars(start="2022-01-03", periods=10):
+    index = pd.bdate_range(start, periods=periods)
+    close = np.linspace(100, 110, periods)
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1e5}, index=index)
+
+
+def test_corrupt_local_file_falls_through_to_next_provider(tmp_path):
+    (tmp_path / "AAA.NS.parquet").write_bytes(b"not a parquet file")
+    chain = ProviderChain([LocalProvider(str(tmp_path)), MemoryProvider({"AAA.NS": bars()})])
+    data = chain.fetch(["AAA.NS"], "2022-01-01", "2022-02-01")
+    assert data["Close"]["AAA.NS"].iloc[-1] == pytest.approx(110)
+    assert data.dtypes.eq(np.float32).all()
+
+
+def test_unreadable_store_falls_through_to_next_provider(tmp_path):
+    store = BarStore(str(tmp_path))
+    with open(store.path("AAA.NS"), "wb") as f:
+        f.write(b"truncated")
+    chain = ProviderChain([BarStoreProvider(store), MemoryProvider({"AAA.NS": bars()})])
+    assert not chain.fetch(["AAA.NS"], "2022-01-01", "2022-02-01").empty
+
+
+class Flaky:
+    name = "flaky"
+
+    def __init__(self, failures, sleep=0.0):
+        self.failures = failures
+        self.sleep = sleep
+        self.calls = 0
+
+    def fetch(self, tickers, start, end):
+        self.calls += 1
+        time.sleep(self.sleep)
+        if self.calls <= self.failures:
+            raise RuntimeError("upstream error")
+        return MemoryProvider({"AAA.NS": bars()}).fetch(tickers, start, end)
+
+
+def test_resilient_provider_retries_then_succeeds():
+    provider = Flaky(failures=2)
+    data = ResilientProvider(provider, retries=3, delay=0.0).fetch(["AAA.NS"], "2022-01-01", "2022-02-01")
+    assert provider.calls == 3
+    assert not data.empty
+
+
+def test_resilient_provider_times_out_and_opens_breaker():
+    provider = ResilientProvider(Flaky(failures=0, sleep=0.5), retries=1, timeout=0.05, delay=0.0,
+                                 breaker=CircuitBreaker(threshold=1, reset_after=60))
+    with pytest.raises(ProviderUnavailable, match="timed out"):
+        provider.fetch(["AAA.NS"], "2022-01-01", "2022-02-01")
+    assert provider.breaker.state == "open"
+    with pytest.raises(ProviderUnavailable, match="circuit open"):
+        provider.fetch(["AAA.NS"], "2022-01-01", "2022-02-01")
+
+
+def test_stuck_call_is_waited_on_not_resubmitted_within_the_deadline():
+    flaky = Flaky(failures=0, sleep=0.4)
+    provider = ResilientProvider(flaky, retries=5, timeout=0.1, delay=0.01, deadline=0.3)
+    started = time.monotonic()
+    with pytest.raises(ProviderUnavailable, match="timed out"):
+        provider.fetch(["AAA.NS"], "2022-01-01", "2022-02-01")
+    assert time.monotonic() - started < 0.4
+    assert flaky.calls == 1
+
+
+def test_fetch_async_backs_off_without_blocking_the_loop():
+    flaky = Flaky(failures=2)
+    provider = ResilientProvider(flaky, retries=3, delay=0.05)
+
+    async def fetch_and_tick():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticking = asyncio.create_task(ticker())
+        data = await ProviderChain([provider]).fetch_async(["AAA.NS"], "2022-01-01", "2022-02-01")
+        ticking.cancel()
+        return data, ticks
+
+    data, ticks = asyncio.run(fetch_and_tick())
+    assert flaky.calls == 3 and not data.empty
+    # The loop kept running through at least 0.15s of backoff
+    assert ticks >= 10
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from robustness import _universe_subset, run_robustness
+
+
+def dense_subset(rng, weights, returns, sims, fraction):
+    # Reference: one draw per (simulation, period, ticker), unheld cells included
+    keep = rng.random((sims,) + weights.shape) < fraction
+    kept_weights = weights[None, :, :] * keep
+    totals = kept_weights.sum(axis=2)
+    portfolio = (kept_weights * returns[None, :, :]).sum(axis=2)
+    return np.where(totals > 0, portfolio / np.where(totals > 0, totals, 1), 0.0)
+
+
+def held_matrix(periods, tickers, held, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = np.zeros((periods, tickers))
+    for period in range(periods - 1):
+        weights[period, rng.choice(tickers, held, replace=False)] = 1.0 / held
+    # The last period is held in cash
+    returns = rng.normal(0.01, 0.05, (periods, tickers))
+    return weights, returns
+
+
+def test_universe_subset_keeps_every_name_at_fraction_one():
+    weights, returns = held_matrix(12, 40, 5)
+    simulated, _ = _universe_subset(np.random.default_rng(1), weights, returns, 3, {"subset_fraction": 1.0})
+    expected = (weights * returns).sum(axis=1)
+    assert np.allclose(simulated, expected[None, :])
+    assert np.all(simulated[:, -1] == 0)
+
+
+def test_universe_subset_matches_the_dense_distribution():
+    weights, returns = held_matrix(20, 30, 6)
+    params = {"subset_fraction": 0.5}
+    sparse, _ = _universe_subset(np.random.default_rng(2), weights, returns, 4000, params)
+    dense = dense_subset(np.random.default_rng(3), weights, returns, 4000, params["subset_fraction"])
+    assert np.allclose(sparse.mean(axis=0), dense.mean(axis=0), atol=0.005)
+    assert np.allclose(sparse.std(axis=0), dense.std(axis=0), atol=0.005)
+
+
+def test_universe_subset_on_a_wide_universe_is_seeded():
+    # Hundreds of names over the run, 10 held per period: a dense draw is sims x periods x every name
+    rows = []
+    weights, returns = held_matrix(60, 5000, 10)
+    dates = pd.date_range("2015-01-01", periods=60, freq="MS").strftime("%Y-%m-%d")
+    for period, ticker in zip(*np.nonzero(weights)):
+        rows.append({"date": dates[period], "ticker": f"T{ticker}", "weight": weights[period, ticker],
+                     "return_pct": returns[period, ticker] * 100})
+    composition = pd.DataFrame(rows)
+    first = run_robustness(composition, 12, "universe_subset", 500, 7, {"subset_fraction": 0.8}, workers=1)
+    second = run_robustness(composition, 12, "universe_subset", 500, 7, {"subset_fraction": 0.8}, workers=1)
+    assert first == second
+    assert first["periods"] == 59 and first["cagr"]
@@ -0,0 +1,68 @@
+import os
+
+from sqlalchemy import create_engine, inspect
+
+import loadtest
+from registry import create_registry
+
+CONFIG = {**loadtest.BACKTEST_CONFIG, "start_date": "2021-01-01", "end_date": "2022-06-30"}
+
+
+def run_backtest(client):
+    response = client.post("/run-backtest", json=CONFIG)
+    assert response.status_code == 200
+    return response.json()["run_id"]
+
+
+def test_retention_failure_keeps_the_run(app_module, client, monkeypatch):
+    def broken_retention(*args, **kwargs):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(app_module, "apply_retention", broken_retention)
+    run_id = run_backtest(client)
+    run = client.get(f"/runs/{run_id}").json()
+    assert run["status"] == "completed"
+
+
+def test_retention_endpoint_removes_old_runs(client):
+    run_backtest(client)
+    newest = run_backtest(client)
+    response = client.post("/runs/retention", params={"max_runs": 1})
+    assert response.status_code == 200
+    assert response.json()["deleted"] >= 1
+
+    runs = client.get("/runs").json()
+    assert [run["run_id"] for run in runs["runs"]] == [newest]
+    artifacts = client.get(f"/runs/{newest}").json()["artifacts"]
+    assert all(os.path.exists(path) for path in artifacts.values())
+
+
+def test_delete_run_removes_its_files(client):
+    run_id = run_backtest(client)
+    artifacts = client.get(f"/runs/{run_id}").json()["artifacts"]
+    assert client.delete(f"/runs/{run_id}").status_code == 200
+    assert not any(os.path.exists(path) for path in artifacts.values())
+    assert client.get(f"/runs/{run_id}").status_code == 404
+
+
+def test_compare_aligns_runs_with_the_benchmark(client):
+    run_ids = [run_backtest(client), run_backtest(client)]
+    response = client.get("/compare", params={"run_ids": ",".join(run_ids), "max_points": 50})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["reference"] == "benchmark"
+    assert set(body["series"]) == {"benchmark", *run_ids}
+    assert 0 < body["points"] <= 50 and len(body["dates"]) == body["points"]
+
+
+def test_registry_indexes_are_added_to_an_existing_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'registry.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE backtest_runs (run_id TEXT PRIMARY KEY, created_at TIMESTAMP NOT NULL, "
+                             "status TEXT NOT NULL, rebalance_frequency TEXT, position_sizing TEXT, cagr REAL, "
+                             "sharpe REAL, max_drawdown REAL, size_bytes BIGINT)")
+    create_registry(engine)
+    create_registry(engine)
+    indexed = {tuple(index["column_names"]) for index in inspect(engine).get_indexes("backtest_runs")}
+    for column in ["created_at", "status", "rebalance_frequency", "position_sizing", "cagr", "sharpe", "max_drawdown", "size_bytes"]:
+        assert (column,) in indexed
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from scheduler import build_schedule, load_holidays, map_to_rows, trading_days
+
+HOLIDAYS = pd.DatetimeIndex(["2024-03-29", "2024-04-11", "2024-05-01"])
+
+
+def schedule(frequency, start, end, rebalance_day=None):
+    config = SimpleNamespace(start_date=start, end_date=end, rebalance_frequency=frequency,
+                             rebalance_day=rebalance_day, signal_dates=None)
+    return [d.strftime("%Y-%m-%d") for d in build_schedule(config, holidays=HOLIDAYS)]
+
+
+def test_month_end_rolls_back_to_the_last_trading_day():
+    # 2024-03-31 is a Sunday and 03-29 Good Friday; 2024-06-30 is a Sunday
+    assert schedule("month_end", "2024-03-01", "2024-07-15") == [
+        "2024-03-01", "2024-03-28", "2024-04-30", "2024-05-31", "2024-06-28", "2024-07-15",
+    ]
+
+
+def test_day_of_month_rolls_forward_and_clamps_to_the_month_end():
+    assert schedule("day_of_month", "2024-03-01", "2024-06-05", rebalance_day=11) == [
+        "2024-03-01", "2024-03-11", "2024-04-12", "2024-05-13", "2024-06-05",
+    ]
+    # Day 31 is the last day of shorter months, not the 28th
+    assert schedule("day_of_month", "2024-01-01", "2024-05-05", rebalance_day=31) == [
+        "2024-01-01", "2024-01-31", "2024-02-29", "2024-04-01", "2024-04-30", "2024-05-03",
+    ]
+
+
+def test_weekly_skips_holidays():
+    assert schedule("weekly", "2024-03-22", "2024-04-16") == [
+        "2024-03-22", "2024-04-01", "2024-04-05", "2024-04-12", "2024-04-16",
+    ]
+
+
+def test_festival_holidays_are_not_trading_days():
+    calendar = trading_days("2024-01-01", "2024-12-31", load_holidays())
+    # Holi, Diwali (Laxmi Pujan) and Guru Nanak Jayanti
+    for holiday in ["2024-03-25", "2024-11-01", "2024-11-15"]:
+        assert pd.Timestamp(holiday) not in calendar
+
+
+def test_map_to_rows_at_chunk_edges():
+    index = trading_days("2024-03-01", "2024-03-29", HOLIDAYS)
+    dates = pd.DatetimeIndex(["2024-03-02", "2024-03-11", "2024-03-23"])
+    # Inside a run the last date is the next chunk's first: first price on or after it
+    rows = map_to_rows(dates, index, run_end=False)
+    assert list(index[rows].strftime("%Y-%m-%d")) == ["2024-03-04", "2024-03-11", "2024-03-25"]
+    # At the end of the run it maps to the last price on or before it
+    rows = map_to_rows(dates, index, run_end=True)
+    assert list(index[rows].strftime("%Y-%m-%d")) == ["2024-03-04", "2024-03-11", "2024-03-22"]
+    # A date past the last price never reads beyond the index
+    rows = map_to_rows(pd.DatetimeIndex(["2024-03-27", "2024-04-10"]), index, run_end=False)
+    assert np.array_equal(rows, [len(index) - 2, len(index) - 1])
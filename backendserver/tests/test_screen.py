@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+SCREEN = {"as_of": "2022-06-30", "market_cap_min": 0, "market_cap_max": 1e13, "roce": 0, "pat": 0}
+
+
+def test_screen_applies_filters(client):
+    response = client.post("/screen", json={**SCREEN, "roce": 20, "market_cap_min": 50000})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["as_of"] == "2022-06-30"
+    assert body["count"] == len(body["companies"]) > 0
+    for company in body["companies"]:
+        assert company["roce"] >= 20
+        assert company["market_cap"] >= 50000
+
+
+def test_screen_is_point_in_time(client):
+    # FY2022 closes on 31 March 2022 and, with the 60 day lag, is visible from 30 May
+    before = client.post("/screen", json={**SCREEN, "as_of": "2022-05-15"}).json()
+    after = client.post("/screen", json=SCREEN).json()
+    assert {company["year"] for company in before["companies"]} == {2021}
+    assert {company["year"] for company in after["companies"]} == {2022}
+
+
+def test_screen_ranks_and_truncates(client):
+    body = client.post("/screen", json={**SCREEN, "ranking": "roe:desc", "portfolio_size": 5}).json()
+    roes = [company["roe"] for company in body["companies"]]
+    assert body["count"] == 5
+    assert roes == sorted(roes, reverse=True)
+
+
+def test_screen_before_any_publication_is_empty(client):
+    response = client.post("/screen", json={**SCREEN, "as_of": "2015-01-01"})
+    assert response.status_code == 200
+    assert response.json() == {"as_of": "2015-01-01", "count": 0, "companies": []}
+
+
+def test_screen_rejects_price_factors(client):
+    response = client.post("/screen", json={**SCREEN, "ranking": "mom12:desc"})
+    assert response.status_code == 400
+
+
+def test_runs_listing_uses_async_engine(client):
+    response = client.get("/runs", params={"limit": 5})
+    assert response.status_code == 200
+    assert set(response.json()) == {"total", "runs"}
+
+
+@pytest.mark.parametrize("as_of", ["2021-05-29", "2021-05-30", "2022-06-30"])
+def test_latest_row_query_matches_the_full_history(app_module, as_of):
+    as_of = pd.Timestamp(as_of)
+    with app_module.engine.connect() as conn:
+        history_df = app_module.read_fundamentals_history(conn, as_of.year)
+        latest_df = pd.read_sql(app_module.latest_fundamentals_query(as_of, 60), conn)
+    assert not latest_df["company_id"].duplicated().any()
+
+    config = SimpleNamespace(**{**SCREEN, "reporting_lag_days": 60})
+    full = app_module.screen_fundamentals(history_df, [as_of], config)[as_of]
+    latest = app_module.screen_fundamentals(latest_df, [as_of], config)[as_of]
+    key = ["company_id", "year"]
+    pd.testing.assert_frame_equal(full.sort_values(key).reset_index(drop=True), latest.sort_values(key).reset_index(drop=True))
+
+
+def test_screen_builds_the_universe_index_once(app_module, client, monkeypatch):
+    built = []
+    read_universe = app_module.read_universe
+
+    def counting_read(conn, universe_name):
+        built.append(universe_name)
+        return read_universe(conn, universe_name)
+
+    monkeypatch.setattr(app_module, "read_universe", counting_read)
+    monkeypatch.setattr(app_module, "_universe_cache", {})
+    for _ in range(3):
+        assert client.post("/screen", json=SCREEN).status_code == 200
+    assert built == [None]
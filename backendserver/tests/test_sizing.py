@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sizing import risk_contributions, risk_parity, size_periods
+
+
+def random_covariances(periods, names, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, (periods, 60, names)) * rng.uniform(0.5, 3, (periods, 1, names))
+    return np.stack([np.cov(r, rowvar=False) for r in returns])
+
+
+def test_risk_parity_equalises_contributions():
+    cov = random_covariances(8, 6)
+    mask = np.ones((8, 6), dtype=bool)
+    weights = risk_parity(cov, mask)
+    contributions = risk_contributions(cov, weights)
+    assert np.all(weights > 0)
+    np.testing.assert_allclose(weights.sum(axis=1), 1.0)
+    np.testing.assert_allclose(contributions / contributions.mean(axis=1, keepdims=True), 1.0, rtol=1e-6)
+
+
+def test_risk_parity_keeps_negative_marginal_names():
+    # Name 2 hedges the others: its marginal risk at equal weights is negative
+    cov = np.array([[[0.04, 0.03, -0.018], [0.03, 0.04, -0.018], [-0.018, -0.018, 0.01]]])
+    mask = np.ones((1, 3), dtype=bool)
+    equal = np.full((1, 3), 1 / 3)
+    assert np.einsum("pij,pj->pi", cov, equal)[0, 2] < 0
+
+    weights = risk_parity(cov, mask)
+    contributions = risk_contributions(cov, weights)
+    assert weights[0, 2] > 0
+    np.testing.assert_allclose(contributions[0], contributions[0].mean(), rtol=1e-6)
+
+
+def test_risk_parity_ignores_masked_names():
+    cov = random_covariances(2, 5, seed=1)
+    mask = np.array([[True, True, True, False, False], [True] * 5])
+    weights = risk_parity(cov, mask)
+    assert np.all(weights[0, 3:] == 0)
+    held = risk_contributions(cov[:1, :3, :3], weights[:1, :3])
+    np.testing.assert_allclose(held, held.mean(), rtol=1e-6)
+
+
+class Config:
+    position_sizing = "risk_parity"
+    min_weight = 0.0
+    max_weight = 1.0
+
+
+def test_size_periods_sizes_each_period():
+    rng = np.random.default_rng(2)
+    dates = pd.bdate_range("2020-01-01", periods=80)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (80, 4)), axis=0)),
+                          index=dates, columns=["A", "B", "C", "D"])
+    tickers_by_period = [["A", "B", "C"], ["B", "D"]]
+    weights = size_periods(tickers_by_period, Config(), trailing_by_period=[prices.iloc[:40], prices.iloc[40:]])
+
+    assert [list(w) for w in weights] == tickers_by_period
+    for period in weights:
+        assert sum(period.values()) == pytest.approx(1.0)
+        assert min(period.values()) > 0
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+import factors
+import loadtest
+
+CONFIG = {**loadtest.BACKTEST_CONFIG, "start_date": "2021-01-01", "end_date": "2022-06-30",
+          "rebalance_frequency": "monthly", "ranking": "mom3:desc,roe:desc"}
+
+
+def run_exports(client, monkeypatch, streaming):
+    # Fresh factor cache, so each run computes its own factor values
+    monkeypatch.setattr(factors, "_factor_cache", factors.OrderedDict())
+    response = client.post("/run-backtest", params={"streaming": streaming}, json=CONFIG)
+    assert response.status_code == 200
+    artifacts = client.get(f"/runs/{response.json()['run_id']}").json()["artifacts"]
+    exports = {name: pd.read_csv(path) for name, path in artifacts.items() if name != "config"}
+    return response.json(), {name: frame.drop(columns="run_id", errors="ignore") for name, frame in exports.items()}
+
+
+@pytest.mark.parametrize("chunk_periods", [1, 4])
+def test_streamed_and_buffered_runs_export_the_same_rows(app_module, client, monkeypatch, chunk_periods):
+    monkeypatch.setattr(app_module, "STREAM_CHUNK_PERIODS", chunk_periods)
+    buffered, buffered_exports = run_exports(client, monkeypatch, streaming=False)
+    streamed, streamed_exports = run_exports(client, monkeypatch, streaming=True)
+
+    assert buffered["equity_curve"] == streamed["equity_curve"]
+    assert buffered["metrics"] == streamed["metrics"]
+    assert buffered_exports.keys() == streamed_exports.keys()
+    for name, frame in buffered_exports.items():
+        pd.testing.assert_frame_equal(frame, streamed_exports[name], check_dtype=False)
+    assert len(buffered_exports["portfolio_composition"]) > 0
+
+
+def test_streamed_run_downloads_factor_prices_per_chunk(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, "STREAM_CHUNK_PERIODS", 1)
+    spans = []
+    fetch_factor_prices = app_module.fetch_factor_prices
+
+    def recording_fetch(tickers, start, end):
+        spans.append(pd.Timestamp(end) - pd.Timestamp(start))
+        return fetch_factor_prices(tickers, start, end)
+
+    monkeypatch.setattr(app_module, "fetch_factor_prices", recording_fetch)
+    run_exports(client, monkeypatch, streaming=True)
+    # One month of rebalance dates plus the 3-month lookback, never the whole run
+    assert len(spans) > 1
+    assert max(spans) < pd.Timedelta(days=150)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import loadtest
+from providers import MemoryProvider, ProviderChain
+
+CONFIG = {**loadtest.BACKTEST_CONFIG, "start_date": "2021-01-01", "end_date": "2022-06-30"}
+
+
+def run(client):
+    response = client.post("/run-backtest", json=CONFIG)
+    assert response.status_code == 200
+    run = client.get(f"/runs/{response.json()['run_id']}").json()
+    return response.json(), pd.read_csv(run["artifacts"]["portfolio_composition"])
+
+
+def test_name_that_stops_trading_exits_at_its_last_price(app_module, client, monkeypatch):
+    _, composition = run(client)
+    dates = sorted(composition["date"].unique())
+    # A name held in the second period that stops trading three weeks into it
+    ticker = composition.loc[composition["date"] == dates[1], "ticker"].iloc[0]
+    last_day = pd.Timestamp(dates[1]) + pd.Timedelta(days=21)
+
+    frames = loadtest.synthetic_bars(composition["ticker"].unique().tolist() + ["^NSEI"])
+    frames[ticker] = frames[ticker][frames[ticker].index <= last_day]
+    monkeypatch.setattr(app_module, "market_data", ProviderChain([MemoryProvider(frames)]))
+    result, composition = run(client)
+
+    held = composition[(composition["date"] == dates[1]) & (composition["ticker"] == ticker)]
+    assert len(held) == 1
+    assert held["end_price"].iloc[0] == pytest.approx(frames[ticker]["Close"].iloc[-1], rel=1e-6)
+    assert np.isfinite(held["value"].iloc[0]) and held["value"].iloc[0] > 0
+    # Only once it has no price at a rebalance is it dropped, and flagged
+    flagged = [flag["date"] for flag in result["data_quality"]["flags"] if ticker in flag["missing"]]
+    assert flagged and min(flagged) > dates[2]
+
+
+def test_universe_without_membership_table_is_rejected(client):
+    response = client.post("/run-backtest", json={**CONFIG, "universe": "NIFTY100"})
+    assert response.status_code == 400
+    screen = {"as_of": "2022-06-30", "market_cap_min": 0, "market_cap_max": 1e12, "roce": 0, "pat": 0}
+    response = client.post("/screen", json={**screen, "universe": "NIFTY100"})
+    assert response.status_code == 400
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+
+# ------------------ Point-in-time Universe ------------------
+# Listing and index-membership intervals are turned into a step function: the
+# sorted interval boundaries split time into segments, and each segment stores
+# which companies are members. "Members as of D" is a binary search for D's
+# segment followed by one row read.
+
+
+class MembershipIndex:
+    def __init__(self, intervals):
+        # intervals: DataFrame(company_id, start_date, end_date); end_date is
+        # exclusive and NaT for intervals that are still open
+        intervals = intervals.dropna(subset=["start_date"])
+        self.company_ids = np.sort(intervals["company_id"].unique())
+        starts = pd.DatetimeIndex(intervals["start_date"]).to_numpy()
+        ends = pd.DatetimeIndex(intervals["end_date"]).to_numpy()
+        self.breakpoints = np.unique(np.concatenate([starts, ends[~np.isnat(ends)]]))
+
+        # Difference array over (segments x companies), cumulated into membership counts
+        columns = np.searchsorted(self.company_ids, intervals["company_id"].to_numpy())
+        start_rows = np.searchsorted(self.breakpoints, starts)
+        end_rows = np.where(np.isnat(ends), len(self.breakpoints), np.searchsorted(self.breakpoints, ends))
+        counts = np.zeros((len(self.breakpoints) + 1, len(self.company_ids)), dtype=np.int32)
+        np.add.at(counts, (start_rows, columns), 1)
+        np.add.at(counts, (end_rows, columns), -1)
+        self.members = np.cumsum(counts, axis=0)[:-1] > 0
+
+    def _segments(self, dates):
+        return np.searchsorted(self.breakpoints, pd.DatetimeIndex(dates).to_numpy(), side="right") - 1
+
+    def members_as_of(self, date):
+        segment = self._segments([date])[0]
+        if segment < 0:
+            return self.company_ids[:0]
+        return self.company_ids[self.members[segment]]
+
+
+class Universe:
+    def __init__(self, listings=None, membership=None):
+        # Either side may be missing: no listing data means every company is
+        # always listed, no membership data means no index restriction
+        self.listings = MembershipIndex(listings) if listings is not None and not listings.empty else None
+        self.membership = MembershipIndex(membership) if membership is not None and not membership.empty else None
+
+    def restrict(self, fundamentals_df, date):
+        # Keep only the companies that were listed (and in the index) on the date
+        mask = np.ones(len(fundamentals_df), dtype=bool)
+        for index in (self.listings, self.membership):
+            if index is not None:
+                mask &= fundamentals_df["company_id"].isin(index.members_as_of(date)).to_numpy()
+        return fundamentals_df[mask]
+
+
+def listing_intervals(listings_df):
+    return listings_df.rename(columns={"listed_on": "start_date", "delisted_on": "end_date"})[
+        ["company_id", "start_date", "end_date"]
+    ]